@@ -1,39 +1,48 @@
+import hmac
 import json
+import logging
 import os
 import asyncio
 from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv
 from telegram import Update
 from telegram.ext import ApplicationBuilder
 from src.message_handler import BotHandlers
+from src.logger import LazyRepr
+from src import providers, metrics, tracing, profiler
+
+logger = logging.getLogger(__name__)
 
 # Загружаем переменные окружения
 load_dotenv()
 TOKEN = os.getenv('TELEGRAM_TOKEN')
+# Секрет для служебных GET-параметров (профилирование, трассы); без него они отключены
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
 
-# Создаем приложение (глобально для переиспользования между вызовами)
+# Приложение создаётся лениво при первом запросе (глобально для переиспользования
+# между вызовами), чтобы холодный старт не платил за сборку до получения update
 application = None
 
-# Предварительно инициализируем приложение, если токен доступен
-# Примечание: инициализация будет выполнена асинхронно при первом запросе
-if TOKEN:
-    try:
-        print("Pre-creating application...")
-        application = ApplicationBuilder().token(TOKEN).build()
-        handlers = BotHandlers()
-        handlers.setup_handlers(application)
-        
-        # Добавляем обработчик ошибок
-        async def error_handler(update, context):
-            print(f"Update {update} caused error {context.error}")
-            import traceback
-            traceback.print_exc()
-        
-        application.add_error_handler(error_handler)
-        print("Application pre-created successfully (will be initialized on first request)")
-    except Exception as e:
-        print(f"Error pre-creating application: {e}")
-        application = None
+def build_application(request=None):
+    """Создаёт приложение Telegram бота с хендлерами"""
+    print(f"Creating application with token: {TOKEN[:10]}...")
+    builder = ApplicationBuilder().token(TOKEN)
+    if request is not None:
+        # Свой транспорт Bot API (например, заглушка в нагрузочных тестах)
+        builder = builder.request(request)
+    app = builder.build()
+    handlers = BotHandlers()
+    handlers.setup_handlers(app)
+    
+    # Добавляем обработчик ошибок
+    async def error_handler(update, context):
+        logger.error('Update %s caused error: %s', getattr(update, 'update_id', None), context.error,
+                     exc_info=context.error)
+    
+    app.add_error_handler(error_handler)
+    print("Application created successfully")
+    return app
 
 def get_application():
     """Получает или создает приложение Telegram бота"""
@@ -42,25 +51,13 @@ def get_application():
         if not TOKEN:
             print("ERROR: TELEGRAM_TOKEN не найден в переменных окружения")
             raise ValueError("TELEGRAM_TOKEN не найден в переменных окружения")
-        print(f"Creating application with token: {TOKEN[:10]}...")
-        application = ApplicationBuilder().token(TOKEN).build()
-        handlers = BotHandlers()
-        handlers.setup_handlers(application)
-        
-        # Добавляем обработчик ошибок
-        async def error_handler(update, context):
-            print(f"Update {update} caused error {context.error}")
-            import traceback
-            traceback.print_exc()
-        
-        application.add_error_handler(error_handler)
-        print("Application created successfully")
+        application = build_application()
     return application
 
 async def process_update_async(update_data):
     """Асинхронная обработка update"""
     try:
-        print(f"Processing update: {json.dumps(update_data, indent=2)[:200]}")
+        logger.debug('Processing update: %s', LazyRepr(update_data))
         app = get_application()
         
         # Инициализируем приложение, если еще не инициализировано
@@ -71,9 +68,9 @@ async def process_update_async(update_data):
         
         update = Update.de_json(update_data, app.bot)
         if update:
-            print(f"Update parsed: {update.update_id}")
+            logger.debug('Update parsed: %s', update.update_id)
             await app.process_update(update)
-            print("Update processed successfully")
+            logger.debug('Update processed successfully')
         else:
             print("Warning: Update is None")
     except Exception as e:
@@ -88,10 +85,10 @@ class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         """Обрабатывает POST запросы от Telegram"""
         try:
-            print("Received POST request")
+            logger.debug('Received POST request')
             # Читаем тело запроса
             content_length = int(self.headers.get('Content-Length', 0))
-            print(f"Content-Length: {content_length}")
+            logger.debug('Content-Length: %s', content_length)
             
             if content_length == 0:
                 print("Error: Empty body")
@@ -102,7 +99,7 @@ class handler(BaseHTTPRequestHandler):
                 return
                 
             body = self.rfile.read(content_length)
-            print(f"Body received: {len(body)} bytes")
+            logger.debug('Body received: %s bytes', len(body))
             
             try:
                 update_data = json.loads(body.decode('utf-8'))
@@ -137,7 +134,7 @@ class handler(BaseHTTPRequestHandler):
                 # Все равно возвращаем 200, чтобы Telegram не повторял запрос
             
             # Отправляем успешный ответ
-            print("Sending 200 OK response")
+            logger.debug('Sending 200 OK response')
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
@@ -145,6 +142,10 @@ class handler(BaseHTTPRequestHandler):
             self.wfile.write(response.encode())
             self.wfile.flush()
             
+            # Зависимости остальных провайдеров импортируются в фоне уже после
+            # ответа Telegram, чтобы не конкурировать с обработкой этого update
+            providers.preload()
+            
         except Exception as e:
             print(f"Error processing update: {e}")
             import traceback
@@ -159,7 +160,34 @@ class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         """Обрабатывает GET запросы (для проверки работоспособности)"""
         try:
-            print("Received GET request")
+            logger.debug('Received GET request')
+            query = parse_qs(urlparse(self.path).query, keep_blank_values=True)
+            
+            # Метрики в текстовом формате Prometheus: GET /api/webhook?metrics
+            if 'metrics' in query:
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', metrics.CONTENT_TYPE)
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            
+            # Профилирование: GET /api/webhook?profile=<сек>&token=... или ?profile_updates=<K>&token=...
+            if 'profile' in query or 'profile_updates' in query:
+                self.handle_profile_request(query)
+                return
+            
+            # Последние трассы из кольцевого буфера: GET /api/webhook?traces&token=...
+            # (в трассах есть ссылки пользователей и ошибки upstream)
+            if 'traces' in query:
+                if not self.check_token(query):
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps(tracing.recent_traces(), ensure_ascii=False, default=str).encode())
+                return
+            
             # Проверяем, что токен установлен
             if not TOKEN:
                 status = {'status': 'error', 'message': 'TELEGRAM_TOKEN not configured'}
@@ -179,6 +207,39 @@ class handler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({'error': str(e)}).encode())
     
+    def check_token(self, query):
+        """Проверяет PROFILE_TOKEN служебного запроса; при ошибке отвечает 403"""
+        token = query.get('token', [''])[0]
+        if PROFILE_TOKEN and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode()):
+            return True
+        self.send_response(403)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps({'error': 'Forbidden'}).encode())
+        return False
+    
+    def handle_profile_request(self, query):
+        """Запускает профилировщик по аутентифицированному GET-запросу"""
+        if not self.check_token(query):
+            return
+        
+        if 'profile' in query:
+            mode, value = 'sample', query['profile'][0]
+        else:
+            mode, value = 'updates', query['profile_updates'][0]
+        
+        try:
+            status = {'ok': True, 'message': profiler.handle_request(mode, value)}
+            status_code = 200
+        except ValueError as e:
+            status = {'error': str(e)}
+            status_code = 400
+        
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(status).encode())
+    
     def log_message(self, format, *args):
         """Отключаем стандартное логирование, используем print"""
         pass
\ No newline at end of file
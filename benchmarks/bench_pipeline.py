@@ -0,0 +1,133 @@
+"""Бенчмарк конвейера: LinkParser.parse_link, LinkFinder.find_link и
+BotHandlers.handle_message целиком, полностью офлайн.
+
+Запуск: python -m benchmarks.bench_pipeline [--iterations 100] [--concurrency 10]
+        [--latency-ms 20 --jitter-ms 5] [--limits Spotify=4:10] [--update-baseline]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import types
+from unittest.mock import patch
+
+from benchmarks.runner import add_common_arguments, finish, measure
+from benchmarks.stubs import Latency, StubUpstream, fake_sdks, patch_http
+
+# Смесь ссылок, близкая к реальному трафику
+LINKS = (
+    'https://open.spotify.com/track/4u7EnebtmKWzUH433cf5Qv',
+    'https://music.yandex.ru/album/3127/track/32047',
+    'https://mts-music-spo.onelink.me/abc123',
+    'https://open.spotify.com/track/7tFiyTwD0nx5a1eklYtX2J?si=1',
+)
+
+TRACK_INFO = {
+    'url': 'https://open.spotify.com/track/4u7EnebtmKWzUH433cf5Qv',
+    'title': 'Bohemian Rhapsody - Remastered 2011',
+    'artists': 'Queen',
+}
+
+
+class FakeMessage:
+    """Сообщение Telegram с задержкой Bot API"""
+
+    def __init__(self, text, latency, message_id=1):
+        self.text = text
+        self.chat_id = 1
+        self.message_id = message_id
+        self.latency = latency
+
+    async def reply_text(self, text, parse_mode=None):
+        await self.latency.wait()
+        return FakeMessage(text, self.latency, self.message_id + 1)
+
+    async def edit_text(self, text, parse_mode=None):
+        await self.latency.wait()
+        self.text = text
+        return self
+
+
+class NoCache:
+    """Кэш, который ничего не хранит: каждый вызов доходит до апстрима"""
+
+    name = 'benchmark'
+
+    def __contains__(self, key):
+        return False
+
+    def expires_at(self, key):
+        return None
+
+    async def get_or_load(self, key, loader, cacheable=None, ttl=None):
+        return await loader()
+
+    async def refresh(self, key, loader, cacheable=None, ttl=None):
+        return await loader()
+
+
+def fake_update(update_id, text, latency):
+    return types.SimpleNamespace(update_id=update_id, message=FakeMessage(text, latency), effective_user=None)
+
+
+async def run(args):
+    from src import ratelimit
+    from src.cache import Popularity
+    from src.constants import SERVICES
+    from src.link_finder import LinkFinder
+    from src.link_parser import LinkParser
+    from src.message_handler import BotHandlers
+
+    upstream_latency = Latency(args.latency_ms / 1000, args.jitter_ms / 1000, seed=1)
+    telegram_latency = Latency(args.telegram_ms / 1000, 0, seed=2)
+    results = []
+
+    async with StubUpstream(upstream_latency) as upstream:
+        with patch_http(upstream), fake_sdks(upstream_latency):
+            # Собственные парсер и поисковик без кэша: измеряются запросы к
+            # апстримам, а не попадания в общие PARSE_CACHE/FIND_CACHE
+            parser = LinkParser(cache=NoCache(), popularity=Popularity())
+
+            async def parse(i):
+                await parser.parse_link(LINKS[i % len(LINKS)])
+
+            finder = LinkFinder(cache=NoCache())
+            track_info = dict(TRACK_INFO, original_service=SERVICES['Spotify'])
+
+            async def find(i):
+                await finder.find_link(track_info)
+
+            handlers = BotHandlers()
+
+            async def handle(i):
+                await handlers.handle_message(fake_update(i, f'check this {LINKS[i % len(LINKS)]} !', telegram_latency), None)
+
+            # Ограничения upstream по умолчанию рассчитаны на реальные API и
+            # упёрли бы замер в квоту; заглушкам они не нужны, если не заданы --limits
+            with patch.dict('src.ratelimit._limiters', clear=True), \
+                    patch('src.message_handler.parse_link', parser.parse_link), \
+                    patch('src.message_handler.find_link', finder.find_link):
+                ratelimit.configure(ratelimit.parse_limits(args.limits))
+                for name, operation in (('parse_link', parse), ('find_link', find), ('handle_message', handle)):
+                    results.append(await measure(name, operation, args.iterations, args.concurrency))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline pipeline benchmark')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=5)
+    parser.add_argument('--telegram-ms', type=float, default=10)
+    parser.add_argument('--limits', default='', help='Ограничения upstream: Spotify=4:10,MTS=2:5')
+    add_common_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.getLogger('src').setLevel(logging.ERROR)
+    results = asyncio.run(run(args))
+    return finish(results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
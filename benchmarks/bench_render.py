@@ -0,0 +1,84 @@
+"""Микробенчмарк рендеринга ответа MarkdownV2: экранирование, рендеринг
+без кэша и ответ из кэша готовых сообщений.
+
+Запуск: python -m benchmarks.bench_render [--iterations 20000] [--update-baseline]
+"""
+import argparse
+import logging
+import re
+import sys
+
+from benchmarks.runner import add_common_arguments, finish, measure_sync
+
+ARTISTS = ('Queen', 'Beyoncé feat. JAY-Z', 'Florence + The Machine', 'AC/DC', 'Sigur Rós', 'Земфира')
+TITLES = ('Bohemian Rhapsody - Remastered 2011', 'Crazy In Love (feat. JAY-Z)', 'Dog Days Are Over',
+          'Highway to Hell', 'Hoppípolla', 'Хочешь?')
+
+
+def legacy_escape(text):
+    """Прежняя реализация escape_markdown (re.sub с шаблоном-строкой)"""
+    if not text:
+        return 'N/A'
+    return re.sub(r'([*_`\[\]()~>#+-=|{}.!])', r'\\\1', text)
+
+
+def legacy_render(data, links):
+    """Прежняя сборка ответа конкатенацией строк"""
+    response = f"*{legacy_escape(data['artists'])}* \\- {legacy_escape(data['title'])}\n"
+    response += f'[{legacy_escape(data["original_service"]["name"])}]({data["url"]})\n'
+    for link_info in links:
+        if link_info.get('url'):
+            response += f'[{legacy_escape(link_info["service"])}]({link_info["url"]})\n'
+    return response
+
+
+def make_tracks(count):
+    from src.records import LinkResult, TrackInfo
+
+    tracks = []
+    for i in range(count):
+        data = TrackInfo('Spotify', f'https://open.spotify.com/track/{i:022d}',
+                         TITLES[i % len(TITLES)], ARTISTS[i % len(ARTISTS)])
+        links = [
+            LinkResult('YandexMusic', f'https://music.yandex.ru/album/{i}/track/{i * 7}'),
+            LinkResult('MTS', f'https://music.mts.ru/search?text=track%20{i}', fallback=True),
+        ]
+        tracks.append((data, links))
+    return tracks
+
+
+def run(args):
+    from src.markdown import TrackRenderer, escape_markdown
+
+    tracks = make_tracks(args.tracks)
+    uncached = TrackRenderer(maxsize=0)
+    cached = TrackRenderer()
+    for data, links in tracks:
+        cached.track(data, links)
+
+    def pick(i):
+        return tracks[i % len(tracks)]
+
+    operations = (
+        ('escape_markdown_legacy', lambda i: legacy_escape(pick(i)[0].title)),
+        ('escape_markdown', lambda i: escape_markdown(pick(i)[0].title)),
+        ('render_track_legacy', lambda i: legacy_render(*pick(i))),
+        ('render_track', lambda i: uncached.track(*pick(i))),
+        ('render_track_cached', lambda i: cached.track(*pick(i))),
+    )
+    return [measure_sync(name, operation, args.iterations) for name, operation in operations]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MarkdownV2 rendering micro-benchmark')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--tracks', type=int, default=500, help='Число разных треков (ключей кэша)')
+    add_common_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.getLogger('src').setLevel(logging.ERROR)
+    return finish(run(args), args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
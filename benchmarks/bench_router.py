@@ -0,0 +1,96 @@
+"""Бенчмарк поиска ссылок в тексте чата: прежняя цепочка (общий
+https?:// regex и затем регулярные выражения всех сервисов по очереди)
+против маршрутизатора по хосту.
+
+Запуск: python -m benchmarks.bench_router [--iterations 200000] [--batch 100] [--messages 2000] [--update-baseline]
+"""
+import argparse
+import random
+import re
+import sys
+
+from benchmarks.runner import add_common_arguments, finish, measure_sync
+
+PLAIN = (
+    'ну что, сегодня вечером собираемся?',
+    'кто-нибудь видел мои ключи',
+    'ахаха да',
+    'Скиньте, пожалуйста, расписание на завтра, я опять всё потерял 🙏',
+    'ok see you at 7',
+    'This is a longer message from a busy group chat where people discuss plans for the weekend '
+    'and nobody posts any links at all, which is the common case for most traffic.',
+)
+FOREIGN = (
+    'смотри https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+    'https://t.me/some_channel/1234 вот тут писали',
+    'статья: https://habr.com/ru/articles/123456/ (интересно)',
+    'https://github.com/python-telegram-bot/python-telegram-bot/issues/1 и https://docs.python.org/3/',
+    'check https://twitter.com/user/status/1234567890!',
+)
+MUSIC = (
+    'послушай https://open.spotify.com/track/4u7EnebtmKWzUH433cf5Qv?si=abc',
+    'https://music.yandex.ru/album/3127/track/32047',
+    'вот: https://mts-music-spo.onelink.me/abc123.',
+    'сначала https://www.youtube.com/watch?v=x потом https://open.spotify.com/track/7tFiyTwD0nx5a1eklYtX2J',
+)
+
+
+def chat_corpus(count, seed=1, foreign_ratio=0.2, music_ratio=0.1):
+    """Сообщения группового чата: в основном текст, часть с посторонними ссылками, немного музыки"""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < music_ratio:
+            messages.append(rng.choice(MUSIC))
+        elif roll < music_ratio + foreign_ratio:
+            messages.append(rng.choice(FOREIGN))
+        else:
+            messages.append(rng.choice(PLAIN))
+    return messages
+
+
+def legacy_route(text, url_regex=re.compile(r'https?://[^\s]+')):
+    """Прежний путь: первая ссылка любого сайта, затем регулярные выражения сервисов по очереди"""
+    from src.constants import SERVICES
+
+    match = url_regex.search(text)
+    if not match:
+        return None
+    url = match.group(0)
+    for name, service in SERVICES.items():
+        if service['regex'].match(url):
+            return name, url
+    return None
+
+
+def run(args):
+    from src.router import ROUTER
+
+    messages = chat_corpus(args.messages)
+
+    def pick(i):
+        return messages[i % len(messages)]
+
+    operations = (
+        ('route_chat_legacy', lambda i: legacy_route(pick(i))),
+        ('route_chat', lambda i: ROUTER.first_supported(pick(i))),
+    )
+    return [measure_sync(name, operation, args.iterations, batch=args.batch) for name, operation in operations]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Link routing benchmark on chat text')
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--batch', type=int, default=100, help='Операций в одном замере времени')
+    parser.add_argument('--messages', type=int, default=2000)
+    add_common_arguments(parser)
+    args = parser.parse_args(argv)
+    results = run(args)
+    legacy, routed = (result.percentile(50) for result in results)
+    print(f'Маршрутизатор быстрее прежней цепочки в {legacy / routed:.2f} раза (медиана на операцию)')
+    return finish(results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
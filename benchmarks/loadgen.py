@@ -0,0 +1,399 @@
+"""Нагрузочный тест и воспроизведение трафика для webhook и polling.
+
+Генерирует реалистичные update'ы Telegram (сообщения и inline-запросы,
+смесь сервисов, «горячие» треки, всплески) или воспроизводит записанный
+трафик, подаёт их в webhook-обработчик или диспетчер Application
+(режим polling) с заглушками Telegram и музыкальных сервисов и ищет
+точку насыщения.
+
+Запуск:
+  python -m benchmarks.loadgen --target polling --rates 2,5,10,20 --step-seconds 10
+  python -m benchmarks.loadgen --target webhook --rates 2,5,10
+  python -m benchmarks.loadgen --replay captured.jsonl --replay-speed 2
+  python -m benchmarks.loadgen --generate 1000 > updates.jsonl
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import HTTPServer
+
+from benchmarks.stubs import Latency, StubUpstream, fake_sdks, make_telegram_request, patch_http
+
+STUB_TOKEN = '123456:stub-token'
+
+# Доли типов ссылок в сообщениях ('text' — сообщения без ссылок)
+DEFAULT_MIX = {'spotify': 0.5, 'yandex': 0.25, 'mts': 0.15, 'text': 0.1}
+
+LINK_TEMPLATES = {
+    'spotify': 'https://open.spotify.com/track/{id:022d}',
+    'yandex': 'https://music.yandex.ru/album/{album}/track/{id}',
+    'mts': 'https://mts-music-spo.onelink.me/{id}',
+}
+
+CHAT_TEXT = (
+    'зацени', 'вот это качает', 'check this out', 'на повторе весь день', 'лол',
+    'кто идёт на концерт?', 'скинь плейлист', 'доброе утро',
+)
+
+
+class UpdateGenerator:
+    """Генератор update'ов Telegram в формате JSON Bot API"""
+
+    def __init__(self, mix=None, inline_ratio=0.2, hot_ratio=0.5, hot_tracks=5, catalog_size=10000, seed=1):
+        self.mix = mix or DEFAULT_MIX
+        self.inline_ratio = inline_ratio
+        self.hot_ratio = hot_ratio
+        self.hot_tracks = hot_tracks
+        self.catalog_size = catalog_size
+        self._random = random.Random(seed)
+        self._update_id = 0
+
+    def link(self, service):
+        if self._random.random() < self.hot_ratio:
+            track_id = self._random.randint(1, self.hot_tracks)
+        else:
+            track_id = self._random.randint(self.hot_tracks + 1, self.catalog_size)
+        return LINK_TEMPLATES[service].format(id=track_id, album=track_id // 10 + 1)
+
+    def text(self):
+        kind = self._random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        chatter = self._random.choice(CHAT_TEXT)
+        if kind == 'text':
+            return chatter
+        return f'{chatter} {self.link(kind)}'
+
+    def next(self):
+        self._update_id += 1
+        user_id = self._random.randint(1, 5000)
+        user = {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}'}
+        if self._random.random() < self.inline_ratio:
+            service = self._random.choice([name for name in self.mix if name != 'text'])
+            return {
+                'update_id': self._update_id,
+                'inline_query': {'id': str(self._update_id), 'from': user, 'query': self.link(service), 'offset': ''},
+            }
+        return {
+            'update_id': self._update_id,
+            'message': {
+                'message_id': self._update_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': user,
+                'text': self.text(),
+            },
+        }
+
+
+def arrival_offsets(rate, duration, burst_factor=1.0, burst_every=0.0, burst_length=0.0, seed=1):
+    """Моменты прихода update'ов (сек от начала): пуассоновский поток со всплесками"""
+    rng = random.Random(seed)
+    offset = 0.0
+    while True:
+        in_burst = burst_every and (offset % burst_every) < burst_length
+        offset += rng.expovariate(rate * (burst_factor if in_burst else 1.0))
+        if offset >= duration:
+            return
+        yield offset
+
+
+def read_replay(path):
+    """Читает записанный трафик: JSONL с update'ами (необязательное поле _offset, сек)"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                update = json.loads(line)
+                yield update.pop('_offset', None), update
+
+
+class Recorder:
+    """Время отправки и завершения update'ов"""
+
+    def __init__(self):
+        self.sent = {}
+        self.done = {}
+
+    def mark_sent(self, update_id):
+        self.sent[update_id] = time.perf_counter()
+
+    def mark_done(self, update_id):
+        if update_id in self.sent and update_id not in self.done:
+            self.done[update_id] = time.perf_counter()
+
+    def outstanding(self):
+        return len(self.sent) - len(self.done)
+
+
+class PollingTarget:
+    """Диспетчер Application: update'ы кладутся в update_queue, как это делает polling"""
+
+    name = 'polling'
+
+    def __init__(self, recorder, telegram_latency, concurrent_updates=False):
+        self.recorder = recorder
+        self.telegram_latency = telegram_latency
+        self.concurrent_updates = concurrent_updates
+        self.app = None
+
+    async def start(self):
+        from telegram import Update
+        from telegram.ext import ApplicationBuilder, TypeHandler
+        from src.message_handler import BotHandlers
+
+        self._update_class = Update
+        builder = ApplicationBuilder().token(STUB_TOKEN).request(make_telegram_request(self.telegram_latency))
+        self.app = builder.concurrent_updates(self.concurrent_updates).build()
+        BotHandlers().setup_handlers(self.app)
+
+        async def done(update, context):
+            self.recorder.mark_done(update.update_id)
+
+        # Группа 1 выполняется после основного хендлера того же update
+        self.app.add_handler(TypeHandler(Update, done), group=1)
+        self.app.add_error_handler(done)
+        await self.app.initialize()
+        await self.app.start()
+
+    async def submit(self, update_data):
+        update = self._update_class.de_json(update_data, self.app.bot)
+        self.recorder.mark_sent(update.update_id)
+        await self.app.update_queue.put(update)
+
+    def queue_depth(self):
+        return self.app.update_queue.qsize()
+
+    async def stop(self):
+        await self.app.stop()
+        await self.app.shutdown()
+
+
+class WebhookTarget:
+    """HTTP-обработчик api/webhook.py (как на Vercel: один запрос за раз на инстанс)"""
+
+    name = 'webhook'
+
+    def __init__(self, recorder, telegram_latency):
+        self.recorder = recorder
+        self.telegram_latency = telegram_latency
+        self._tasks = set()
+
+    async def start(self):
+        import aiohttp
+        from api import webhook
+
+        webhook.TOKEN = STUB_TOKEN
+        webhook.application = webhook.build_application(request=make_telegram_request(self.telegram_latency))
+        self._server = HTTPServer(('127.0.0.1', 0), webhook.handler)
+        threading.Thread(target=self._server.serve_forever, name='webhook-server', daemon=True).start()
+        self._url = f'http://127.0.0.1:{self._server.server_port}/api/webhook'
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+
+    async def _post(self, update_data):
+        update_id = update_data['update_id']
+        self.recorder.mark_sent(update_id)
+        async with self._session.post(self._url, json=update_data) as response:
+            await response.read()
+        self.recorder.mark_done(update_id)
+
+    async def submit(self, update_data):
+        task = asyncio.create_task(self._post(update_data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def queue_depth(self):
+        return self.recorder.outstanding()
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await self._session.close()
+        self._server.shutdown()
+
+
+class StepResult:
+    """Итоги одной ступени нагрузки"""
+
+    def __init__(self, offered_rate, duration, recorder, update_ids, queue_samples, max_queue, drained):
+        self.offered_rate = offered_rate
+        self.sent = len(update_ids)
+        done = [update_id for update_id in update_ids if update_id in recorder.done]
+        self.completed = len(done)
+        self.latencies = sorted(recorder.done[i] - recorder.sent[i] for i in done)
+        if done:
+            first_sent = min(recorder.sent[i] for i in update_ids)
+            last_done = max(recorder.done[i] for i in done)
+            self.throughput = self.completed / max(last_done - first_sent, duration)
+        else:
+            self.throughput = 0.0
+        self.max_queue = max_queue
+        # Прирост очереди за время подачи нагрузки (update'ов в секунду)
+        self.queue_growth = (queue_samples[-1] - queue_samples[0]) / duration if len(queue_samples) > 1 else 0.0
+        self.drained = drained
+
+    def percentile(self, q):
+        if not self.latencies:
+            return float('nan')
+        if len(self.latencies) == 1:
+            return self.latencies[0]
+        return statistics.quantiles(self.latencies, n=100, method='inclusive')[q - 1]
+
+    def saturated(self, slo_seconds):
+        return (
+            not self.drained
+            or self.throughput < 0.9 * self.offered_rate
+            or self.percentile(95) > slo_seconds
+        )
+
+
+async def run_step(target, recorder, schedule, duration, drain_seconds, sample_interval=0.1):
+    """Подаёт update'ы по расписанию [(offset, update)], ждёт обработки"""
+    update_ids = []
+    queue_samples = []
+    stop_sampling = asyncio.Event()
+
+    async def sample_queue():
+        while not stop_sampling.is_set():
+            queue_samples.append(target.queue_depth())
+            await asyncio.sleep(sample_interval)
+
+    sampler = asyncio.create_task(sample_queue())
+    start = time.perf_counter()
+    for offset, update in schedule:
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        update_ids.append(update['update_id'])
+        await target.submit(update)
+    remaining = start + duration - time.perf_counter()
+    if remaining > 0:
+        await asyncio.sleep(remaining)
+    queue_samples.append(target.queue_depth())
+    arrival_samples = list(queue_samples)
+
+    deadline = time.perf_counter() + drain_seconds
+    while time.perf_counter() < deadline and any(i not in recorder.done for i in update_ids):
+        await asyncio.sleep(0.05)
+    stop_sampling.set()
+    await sampler
+    drained = all(i in recorder.done for i in update_ids)
+    offered = len(update_ids) / duration if duration else 0.0
+    return StepResult(offered, duration, recorder, update_ids, arrival_samples,
+                      max(queue_samples, default=0), drained)
+
+
+def print_report(target_name, results, slo_seconds):
+    print(f'target: {target_name}, p95 SLO {slo_seconds * 1000:.0f} ms')
+    header = f"{'offered/s':>10}{'done/s':>9}{'sent':>7}{'done':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max queue':>11}{'queue +/s':>11}"
+    print(header)
+    print('-' * len(header))
+    saturation = None
+    for result in results:
+        marker = ''
+        if saturation is None and result.saturated(slo_seconds):
+            saturation = result
+            marker = '  <- saturation'
+        print(
+            f'{result.offered_rate:>10.1f}{result.throughput:>9.1f}{result.sent:>7}{result.completed:>7}'
+            f'{result.percentile(50) * 1000:>9.0f}{result.percentile(95) * 1000:>9.0f}{result.percentile(99) * 1000:>9.0f}'
+            f'{result.max_queue:>11}{result.queue_growth:>11.2f}{marker}'
+        )
+    if saturation is None:
+        print('Saturation not reached at the tested rates')
+    else:
+        sustained = [result.throughput for result in results if not result.saturated(slo_seconds)]
+        print(f'Saturation at ~{saturation.offered_rate:.1f} updates/s; '
+              f'max sustained {max(sustained, default=0.0):.1f} updates/s')
+    return saturation
+
+
+async def run(args):
+    upstream_latency = Latency(args.latency_ms / 1000, args.jitter_ms / 1000, seed=1)
+    telegram_latency = Latency(args.telegram_ms / 1000, args.telegram_ms / 4000, seed=2)
+    recorder = Recorder()
+    results = []
+
+    async with StubUpstream(upstream_latency) as upstream:
+        with patch_http(upstream), fake_sdks(upstream_latency):
+            if args.target == 'webhook':
+                target = WebhookTarget(recorder, telegram_latency)
+            else:
+                target = PollingTarget(recorder, telegram_latency, args.concurrent_updates or False)
+            await target.start()
+            try:
+                if args.replay:
+                    replay = list(read_replay(args.replay))
+                    rate = args.rates[0]
+                    schedule = [
+                        ((offset if offset is not None else i / rate) / args.replay_speed, update)
+                        for i, (offset, update) in enumerate(replay)
+                    ]
+                    duration = max((offset for offset, _ in schedule), default=0.0) or 1.0
+                    results.append(await run_step(target, recorder, schedule, duration, args.drain_seconds))
+                else:
+                    generator = UpdateGenerator(
+                        inline_ratio=args.inline_ratio, hot_ratio=args.hot_ratio,
+                        hot_tracks=args.hot_tracks, seed=args.seed,
+                    )
+                    for step, rate in enumerate(args.rates):
+                        offsets = arrival_offsets(
+                            rate, args.step_seconds, args.burst_factor, args.burst_every,
+                            args.burst_length, seed=args.seed + step,
+                        )
+                        schedule = [(offset, generator.next()) for offset in offsets]
+                        results.append(await run_step(target, recorder, schedule, args.step_seconds, args.drain_seconds))
+                        if args.stop_at_saturation and results[-1].saturated(args.slo_ms / 1000):
+                            break
+            finally:
+                await target.stop()
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test and replay harness')
+    parser.add_argument('--target', choices=('polling', 'webhook'), default='polling')
+    parser.add_argument('--rates', type=lambda value: [float(rate) for rate in value.split(',')], default=[2, 5, 10, 20])
+    parser.add_argument('--step-seconds', type=float, default=10)
+    parser.add_argument('--drain-seconds', type=float, default=10)
+    parser.add_argument('--slo-ms', type=float, default=3000)
+    parser.add_argument('--stop-at-saturation', action='store_true')
+    parser.add_argument('--inline-ratio', type=float, default=0.2)
+    parser.add_argument('--hot-ratio', type=float, default=0.5)
+    parser.add_argument('--hot-tracks', type=int, default=5)
+    parser.add_argument('--burst-factor', type=float, default=1.0)
+    parser.add_argument('--burst-every', type=float, default=0.0)
+    parser.add_argument('--burst-length', type=float, default=0.0)
+    parser.add_argument('--concurrent-updates', type=int, default=0,
+                        help='Параллельная обработка update\'ов в polling (0 — последовательно, как по умолчанию)')
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=5)
+    parser.add_argument('--telegram-ms', type=float, default=30)
+    parser.add_argument('--replay', help='JSONL с записанными update\'ами')
+    parser.add_argument('--replay-speed', type=float, default=1.0)
+    parser.add_argument('--generate', type=int, help='Вывести N сгенерированных update\'ов в JSONL и выйти')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.generate:
+        generator = UpdateGenerator(inline_ratio=args.inline_ratio, hot_ratio=args.hot_ratio,
+                                    hot_tracks=args.hot_tracks, seed=args.seed)
+        for _ in range(args.generate):
+            print(json.dumps(generator.next(), ensure_ascii=False))
+        return 0
+
+    for name in ('src', 'telegram', 'api'):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    results = asyncio.run(run(args))
+    print_report(args.target, results, args.slo_ms / 1000)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
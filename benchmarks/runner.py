@@ -0,0 +1,183 @@
+"""Измерение, отчёт и сравнение результатов бенчмарков с базовой линией"""
+import asyncio
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# Допустимое ухудшение относительно базовой линии (доля)
+DEFAULT_TOLERANCE = 0.25
+# Число итераций прогона под tracemalloc
+MEMORY_ITERATIONS = 20
+
+
+class BenchResult:
+    """Результат одного бенчмарка"""
+
+    def __init__(self, name, latencies, wall_time, peak_bytes, batch=1):
+        self.name = name
+        self.latencies = sorted(latencies)
+        self.wall_time = wall_time
+        self.peak_bytes = peak_bytes
+        # Операций в одном замере: latencies — время на операцию, усреднённое по пакету
+        self.batch = batch
+
+    def percentile(self, q):
+        if len(self.latencies) == 1:
+            return self.latencies[0]
+        return statistics.quantiles(self.latencies, n=100, method='inclusive')[q - 1]
+
+    @property
+    def throughput(self):
+        return len(self.latencies) * self.batch / self.wall_time if self.wall_time else float('inf')
+
+    def summary(self):
+        summary = {
+            'iterations': len(self.latencies) * self.batch,
+            'throughput': round(self.throughput, 2),
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'peak_kib': round(self.peak_bytes / 1024, 1),
+        }
+        if self.batch > 1:
+            # Медиана времени на операцию: для микробенчмарков сравнивается она, а не p95
+            summary['batch'] = self.batch
+            summary['per_op_ns'] = round(self.percentile(50) * 1e9, 1)
+        return summary
+
+
+async def _run_batch(operation, iterations, concurrency, latencies=None):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await operation(i)
+            if latencies is not None:
+                latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(run_one(i) for i in range(iterations)))
+
+
+async def measure(name, operation, iterations, concurrency=1, memory_iterations=MEMORY_ITERATIONS):
+    """Выполняет корутину operation(i) iterations раз, не более concurrency одновременно.
+
+    Пиковая память измеряется отдельным коротким прогоном: tracemalloc
+    сильно замедляет выделения памяти и исказил бы задержки.
+    """
+    latencies = []
+    start = time.perf_counter()
+    await _run_batch(operation, iterations, concurrency, latencies)
+    wall_time = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        await _run_batch(operation, min(iterations, memory_iterations), concurrency)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return BenchResult(name, latencies, wall_time, peak)
+
+
+def measure_sync(name, operation, iterations, memory_iterations=MEMORY_ITERATIONS, batch=1):
+    """Синхронный вариант measure для микробенчмарков.
+
+    При batch > 1 время замеряется пакетами по batch операций и делится на
+    batch: операции в доли микросекунды короче разрешения и накладных
+    расходов таймера.
+    """
+    batch = max(1, min(batch, iterations))
+    latencies = []
+    start = time.perf_counter()
+    for first in range(0, iterations - iterations % batch, batch):
+        op_start = time.perf_counter()
+        for i in range(first, first + batch):
+            operation(i)
+        latencies.append((time.perf_counter() - op_start) / batch)
+    wall_time = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        for i in range(min(iterations, memory_iterations)):
+            operation(i)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return BenchResult(name, latencies, wall_time, peak, batch)
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    baseline = load_baseline(path)
+    baseline.update({result.name: result.summary() for result in results})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Возвращает список регрессий относительно базовой линии"""
+    regressions = []
+    for result in results:
+        reference = baseline.get(result.name)
+        if not reference:
+            continue
+        current = result.summary()
+        if 'per_op_ns' in current and 'per_op_ns' in reference:
+            if current['per_op_ns'] > reference['per_op_ns'] * (1 + tolerance):
+                regressions.append(f"{result.name}: {current['per_op_ns']} нс/оп > {reference['per_op_ns']} нс/оп")
+        elif current['p95_ms'] > reference['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{result.name}: p95 {current['p95_ms']} мс > {reference['p95_ms']} мс")
+        if current['throughput'] < reference['throughput'] * (1 - tolerance):
+            regressions.append(f"{result.name}: throughput {current['throughput']}/s < {reference['throughput']}/s")
+    return regressions
+
+
+def report(results, baseline=None):
+    baseline = baseline or {}
+    header = f"{'benchmark':<32}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KiB':>10}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        s = result.summary()
+        line = f"{result.name:<32}{s['throughput']:>10}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['peak_kib']:>10}"
+        reference = baseline.get(result.name)
+        if 'per_op_ns' in s:
+            line += f"   {s['per_op_ns']} нс/оп"
+        if reference and 'per_op_ns' in reference:
+            line += f"   (baseline {reference['per_op_ns']} нс/оп, {reference['throughput']}/s)"
+        elif reference:
+            line += f"   (baseline p95 {reference['p95_ms']} мс, {reference['throughput']}/s)"
+        print(line)
+
+
+def add_common_arguments(parser):
+    parser.add_argument('--update-baseline', action='store_true', help='Записать результаты как базовую линию')
+    parser.add_argument('--no-compare', action='store_true', help='Не сравнивать с базовой линией')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+
+
+def finish(results, args):
+    """Печатает отчёт, обновляет или проверяет базовую линию; возвращает код выхода"""
+    baseline = load_baseline(args.baseline)
+    report(results, baseline)
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+        print(f'Базовая линия обновлена: {args.baseline}')
+        return 0
+    if args.no_compare:
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION: {regression}')
+    return 1 if regressions else 0
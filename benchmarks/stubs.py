@@ -0,0 +1,271 @@
+"""Локальные заглушки внешних сервисов для бенчмарков.
+
+- StubUpstream: aiohttp-сервер, отдающий записанные страницы Spotify/MTS
+  с настраиваемой задержкой и разбросом;
+- patch_http: перенаправляет запросы aiohttp.ClientSession на этот сервер;
+- fake_sdks: подменяет spotipy, yandex_music и vk_api клиентами с той же
+  настройкой задержки (вызовы блокирующие, как и у настоящих SDK);
+- make_telegram_request: транспорт Bot API без сети.
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+import types
+import zlib
+from contextlib import contextmanager
+from unittest.mock import patch
+from urllib.parse import quote, urlsplit
+
+import aiohttp
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# Хост внешнего сервиса -> префикс пути на заглушке
+HOST_PREFIXES = {
+    'open.spotify.com': '/spotify',
+    'spotify.link': '/spotify',
+    'mts-music-spo.onelink.me': '/onelink',
+    'music.mts.ru': '/mts',
+}
+
+
+class Latency:
+    """Задержка upstream: среднее значение и равномерный разброс (сек)"""
+
+    def __init__(self, mean=0.0, jitter=0.0, seed=None):
+        self.mean = mean
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def delay(self):
+        if not self.jitter:
+            return self.mean
+        return max(0.0, self.mean + self._random.uniform(-self.jitter, self.jitter))
+
+    async def wait(self):
+        delay = self.delay()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def block(self):
+        delay = self.delay()
+        if delay:
+            time.sleep(delay)
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class StubUpstream:
+    """HTTP-заглушка Spotify и MTS Music"""
+
+    def __init__(self, latency=None):
+        self.latency = latency or Latency()
+        self.requests = 0
+        self._spotify_html = load_fixture('spotify_track.html')
+        self._mts_html = load_fixture('mts_track.html')
+        self._runner = None
+        self.base_url = None
+
+    def _app(self):
+        app = web.Application()
+        app.router.add_get('/spotify/{tail:.*}', self._spotify)
+        app.router.add_get('/onelink/{tail:.*}', self._onelink)
+        app.router.add_get('/mts/{tail:.*}', self._mts)
+        return app
+
+    async def _spotify(self, request):
+        self.requests += 1
+        await self.latency.wait()
+        return web.Response(text=self._spotify_html, content_type='text/html')
+
+    async def _onelink(self, request):
+        # Как настоящий onelink: редирект с deep_link_value на страницу трека
+        self.requests += 1
+        await self.latency.wait()
+        deep_link = quote('https://music.mts.ru/track/' + request.match_info['tail'], safe='')
+        raise web.HTTPFound(f'/mts/landing?deep_link_value={deep_link}')
+
+    async def _mts(self, request):
+        self.requests += 1
+        await self.latency.wait()
+        return web.Response(text=self._mts_html, content_type='text/html')
+
+    async def start(self):
+        self._runner = web.AppRunner(self._app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f'http://127.0.0.1:{port}'
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def rewrite(self, url):
+        """Переписывает URL внешнего сервиса на адрес заглушки"""
+        parts = urlsplit(str(url))
+        prefix = HOST_PREFIXES.get(parts.hostname)
+        if prefix is None:
+            return url
+        query = f'?{parts.query}' if parts.query else ''
+        return f'{self.base_url}{prefix}{parts.path}{query}'
+
+
+@contextmanager
+def patch_http(upstream):
+    """Направляет все запросы aiohttp.ClientSession на заглушку"""
+    original = aiohttp.ClientSession
+
+    def session_factory(*args, **kwargs):
+        session = original(*args, **kwargs)
+        request = session._request
+
+        def rewriting_request(method, url, *request_args, **request_kwargs):
+            return request(method, upstream.rewrite(url), *request_args, **request_kwargs)
+
+        session._request = rewriting_request
+        return session
+
+    with patch.object(aiohttp, 'ClientSession', session_factory):
+        yield
+
+
+def _stable_id(text, digits):
+    return zlib.crc32(text.encode()) % 10 ** digits
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def build_fake_sdks(latency=None):
+    """Создаёт модули spotipy, yandex_music и vk_api с фиктивными клиентами"""
+    latency = latency or Latency()
+    ns = types.SimpleNamespace
+
+    class SpotifyClientCredentials:
+        def __init__(self, client_id=None, client_secret=None):
+            self.client_id = client_id
+
+    class Spotify:
+        def __init__(self, client_credentials_manager=None):
+            self.auth = client_credentials_manager
+
+        def search(self, q, type='track', limit=10):
+            latency.block()
+            track_id = f'{_stable_id(q, 22):022d}'
+            return {'tracks': {'items': [{'external_urls': {'spotify': f'https://open.spotify.com/track/{track_id}'}}]}}
+
+    def yandex_track(track_id, title='Bohemian Rhapsody', artist='Queen'):
+        return ns(id=track_id, title=title, artists=[ns(name=artist)], albums=[ns(id=track_id // 10 + 1)])
+
+    class YandexClient:
+        def __init__(self, token=None):
+            self.token = token
+
+        def init(self):
+            latency.block()
+            return self
+
+        def tracks(self, track_ids):
+            latency.block()
+            return [yandex_track(int(track_id)) for track_id in track_ids]
+
+        def search(self, text, type_='all', page=0, playlist_in_best=True):
+            latency.block()
+            track = yandex_track(_stable_id(text, 8))
+            return ns(tracks=ns(results=[track]), best=ns(type='track', result=track))
+
+    class VkApi:
+        def __init__(self, token=None):
+            self.token = token
+
+        def get_api(self):
+            def search(q, count=1):
+                latency.block()
+                return {'items': [{'url': f'https://music.mts.ru/track/{_stable_id(q, 6)}'}]}
+            return ns(audio=ns(search=search))
+
+    oauth2 = _module('spotipy.oauth2', SpotifyClientCredentials=SpotifyClientCredentials)
+    return {
+        'spotipy': _module('spotipy', Spotify=Spotify, oauth2=oauth2),
+        'spotipy.oauth2': oauth2,
+        'yandex_music': _module('yandex_music', Client=YandexClient),
+        'vk_api': _module('vk_api', VkApi=VkApi),
+    }
+
+
+@contextmanager
+def fake_sdks(latency=None):
+    """Подменяет SDK музыкальных сервисов фиктивными клиентами"""
+    env = {'YANDEX_MUSIC_TOKEN': 'bench', 'MTS_VK_TOKEN': 'bench',
+           'SPOTIFY_CLIENT_ID': 'bench', 'SPOTIFY_CLIENT_SECRET': 'bench'}
+    with patch.dict(sys.modules, build_fake_sdks(latency)), patch.dict(os.environ, env):
+        yield
+
+
+def make_telegram_request(latency=None, on_call=None):
+    """Транспорт Bot API без сети (telegram.request.BaseRequest) с заданной задержкой.
+
+    on_call(method, parameters) вызывается для каждого запроса — так
+    нагрузочный тест узнаёт, что ответ пользователю отправлен.
+    """
+    import json
+    from telegram.request import BaseRequest
+
+    latency = latency or Latency()
+    bot_user = {'id': 1, 'is_bot': True, 'first_name': 'Multilink', 'username': 'multilink_bot'}
+
+    class StubTelegramRequest(BaseRequest):
+        def __init__(self):
+            self.calls = 0
+            self._message_id = 0
+
+        async def initialize(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+        def _message(self, parameters):
+            self._message_id += 1
+            return {
+                'message_id': parameters.get('message_id', self._message_id),
+                'date': int(time.time()),
+                'chat': {'id': parameters.get('chat_id', 1), 'type': 'private'},
+                'from': bot_user,
+                'text': parameters.get('text', ''),
+            }
+
+        async def do_request(self, url, method, request_data=None, **kwargs):
+            self.calls += 1
+            await latency.wait()
+            api_method = url.rsplit('/', 1)[-1]
+            parameters = request_data.parameters if request_data else {}
+            if on_call is not None:
+                on_call(api_method, parameters)
+            if api_method == 'getMe':
+                result = bot_user
+            elif api_method in ('sendMessage', 'editMessageText'):
+                result = self._message(parameters)
+            else:
+                result = True
+            return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+    return StubTelegramRequest()
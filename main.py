@@ -1,7 +1,11 @@
+import logging
 import os
 from dotenv import load_dotenv
 from telegram.ext import ApplicationBuilder
 from src.message_handler import BotHandlers
+from src import providers, metrics, prewarm
+
+logger = logging.getLogger(__name__)
 
 class TelegramBot:
     """Класс для управления Telegram-ботом"""
@@ -21,16 +25,33 @@ class TelegramBot:
         self.handlers = BotHandlers()
         self.handlers.setup_handlers(self.application)
     
+    async def start_cache_maintenance(self, application):
+        """Запускает фоновое обслуживание кэша в event loop бота"""
+        self.cache_task = prewarm.start()
+    
     def run(self):
         """Запускает бота в режиме webhook или polling"""
         print("Бот запущен!")
         
         # Добавляем обработчик ошибок
         async def error_handler(update, context):
-            print(f"Update {update} caused error {context.error}")
+            logger.error('Update %s caused error: %s', getattr(update, 'update_id', None), context.error,
+                         exc_info=context.error)
         
         self.application.add_error_handler(error_handler)
         
+        # Подгружаем зависимости провайдеров в фоне, не задерживая старт
+        providers.preload()
+        
+        # Прогрев кэша и обновление популярных ссылок до истечения TTL
+        self.application.post_init = self.start_cache_maintenance
+        
+        # Эндпоинт /metrics для режима polling (если задан порт)
+        metrics_port = os.getenv('METRICS_PORT')
+        if metrics_port:
+            metrics.start_metrics_server(int(metrics_port))
+            print(f"Метрики доступны на порту {metrics_port}")
+        
         # Проверяем, использовать ли webhook
         use_webhook = os.getenv('USE_WEBHOOK', 'false').lower() == 'true'
         webhook_url = os.getenv('WEBHOOK_URL')
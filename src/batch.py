@@ -0,0 +1,202 @@
+"""Пакетная конвертация ссылок без бота.
+
+Читает ссылки из файла или stdin (по одной на строку), разрешает их через
+LinkParser и LinkFinder и пишет результаты в JSONL по мере готовности
+(порядок — по завершению, номер входной строки в поле "line").
+
+Запуск:
+  python -m src.batch links.txt -o results.jsonl [--workers 16] [--limits Spotify=4:10,MTS=2:5]
+  cat links.txt | python -m src.batch - > results.jsonl
+  python -m src.batch links.txt -o results.jsonl --resume
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from . import ratelimit
+from .link_finder import LinkFinder
+from .link_parser import LinkParser
+from .router import ROUTER
+
+
+class Checkpoint:
+    """Прогресс обработки для возобновления.
+
+    Хранит «водяной знак» (все строки до него обработаны), номера
+    обработанных строк после него (их не больше числа воркеров) и
+    смещение в выходном файле на момент сохранения. Строки, записанные
+    после последнего сохранения, восстанавливаются чтением хвоста вывода.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.watermark = 0
+        self.done = set()
+        self.output_offset = 0
+
+    def mark_done(self, line):
+        self.done.add(line)
+        while self.watermark + 1 in self.done:
+            self.watermark += 1
+            self.done.discard(self.watermark)
+
+    def is_done(self, line):
+        return line <= self.watermark or line in self.done
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding='utf-8') as f:
+            state = json.load(f)
+        self.watermark = state['watermark']
+        self.done = set(state['done'])
+        self.output_offset = state['output_offset']
+        return True
+
+    def save(self, output_offset):
+        self.output_offset = output_offset
+        state = {'watermark': self.watermark, 'done': sorted(self.done), 'output_offset': output_offset}
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def recover(self, output):
+        """Учитывает строки вывода после сохранённого смещения и обрезает недописанную"""
+        output.seek(self.output_offset)
+        offset = self.output_offset
+        for raw in output:
+            if not raw.endswith(b'\n'):
+                break
+            self.mark_done(json.loads(raw)['line'])
+            offset += len(raw)
+        output.seek(offset)
+        output.truncate()
+
+
+class BatchConverter:
+    """Потоковый конвейер: ограниченная очередь, N воркеров, общие кэши"""
+
+    def __init__(self, workers=16, parser=None, finder=None):
+        self.workers = workers
+        self.parser = parser or LinkParser()
+        self.finder = finder or LinkFinder()
+
+    async def resolve(self, url):
+        data = await self.parser.parse_link(url)
+        if data is None:
+            return {'url': url, 'error': 'Unsupported link'}
+        if 'error' in data:
+            return {'url': url, 'error': data['error']}
+        links = await self.finder.find_link(data)
+        if isinstance(links, dict):
+            return {'url': url, 'title': data['title'], 'artists': data['artists'], 'error': links['error']}
+        return {
+            'url': url,
+            'service': data['original_service']['name'],
+            'title': data['title'],
+            'artists': data['artists'],
+            'links': {link['service']: link.get('url') for link in links},
+        }
+
+    async def run(self, lines, write, skip=None, empty=None):
+        """Обрабатывает итератор строк; write(record) вызывается по готовности,
+        empty(line) — для строк без ссылки"""
+        queue = asyncio.Queue(maxsize=self.workers * 2)
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                line, url = item
+                try:
+                    record = await self.resolve(url)
+                except Exception as e:
+                    record = {'url': url, 'error': str(e)}
+                write(dict(record, line=line))
+
+        tasks = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        try:
+            for line, text in enumerate(lines, 1):
+                if skip is not None and skip(line):
+                    continue
+                # Первая ссылка строки; неподдерживаемые попадут в вывод с ошибкой
+                for _, url in ROUTER.extract(text):
+                    await queue.put((line, url))
+                    break
+                else:
+                    if empty is not None:
+                        empty(line)
+            for _ in tasks:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Batch link conversion')
+    parser.add_argument('input', help='Файл со ссылками или "-" для stdin')
+    parser.add_argument('-o', '--output', help='Файл JSONL (по умолчанию stdout)')
+    parser.add_argument('--workers', type=int, default=16, help='Одновременно обрабатываемых ссылок')
+    parser.add_argument('--limits', default='', help='Ограничения upstream: Spotify=4:10,MTS=2:5')
+    parser.add_argument('--checkpoint', help='Файл прогресса (по умолчанию <output>.ckpt)')
+    parser.add_argument('--checkpoint-every', type=int, default=50)
+    parser.add_argument('--resume', action='store_true', help='Продолжить с последнего checkpoint')
+    return parser.parse_args(argv)
+
+
+async def run(args):
+    ratelimit.configure(ratelimit.parse_limits(args.limits))
+    converter = BatchConverter(workers=args.workers)
+    lines = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+
+    checkpoint = None
+    if args.output:
+        checkpoint = Checkpoint(args.checkpoint or f'{args.output}.ckpt')
+        # Без выходного файла результаты прошлого запуска потеряны: начинаем заново
+        resumed = args.resume and os.path.exists(args.output) and checkpoint.load()
+        output = open(args.output, 'r+b' if resumed else 'wb')
+        if resumed:
+            checkpoint.recover(output)
+    else:
+        output = sys.stdout.buffer
+
+    written = 0
+
+    def write(record):
+        nonlocal written
+        output.write(json.dumps(record, ensure_ascii=False).encode() + b'\n')
+        output.flush()
+        written += 1
+        if checkpoint is not None:
+            checkpoint.mark_done(record['line'])
+            if written % args.checkpoint_every == 0:
+                checkpoint.save(output.tell())
+
+    try:
+        # Строки без ссылок тоже отмечаются, иначе водяной знак остановится на первой из них
+        await converter.run(lines, write, skip=checkpoint.is_done if checkpoint else None,
+                            empty=checkpoint.mark_done if checkpoint else None)
+        if checkpoint is not None:
+            checkpoint.save(output.tell())
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+        if output is not sys.stdout.buffer:
+            output.close()
+    return written
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    written = asyncio.run(run(args))
+    print(f'Обработано ссылок: {written}', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import asyncio
+import heapq
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from . import metrics, tracing, records
+from .search_key import search_key
+
+CACHE_TTL = float(os.getenv('CACHE_TTL', 24 * 3600))
+CACHE_MAXSIZE = int(os.getenv('CACHE_MAXSIZE', 50000))
+# Бюджет памяти на один кэш (байты, 0 — без ограничения)
+CACHE_MAXBYTES = int(os.getenv('CACHE_MAXBYTES', 64 * 1024 * 1024))
+
+# Накладные расходы на запись: кортеж записи, время истечения, узел
+# OrderedDict и слот хэш-таблицы (оценка для CPython)
+ENTRY_OVERHEAD = sys.getsizeof((0.0, None, 0)) + sys.getsizeof(0.0) + 100
+
+# Параметры ссылок, не влияющие на трек (метки отслеживания и шаринга)
+TRACKING_PARAMS = frozenset({'si', 'feature', 'fbclid', 'gclid'})
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU-кэш с временем жизни записей и объединением одновременных загрузок.
+
+    Учитывает примерный объём памяти записей и вытесняет старые записи при
+    превышении maxsize или maxbytes.
+    """
+
+    def __init__(self, name, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, maxbytes=CACHE_MAXBYTES):
+        self.name = name
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self.nbytes = 0
+        self._data = OrderedDict()  # key -> (expires_at, value, size)
+        self._pending = {}
+
+    def register_metrics(self):
+        """Публикует размер кэша в метриках multilink_cache_entries/bytes"""
+        metrics.CACHE_ENTRIES.set_function(lambda: len(self._data), cache=self.name)
+        metrics.CACHE_BYTES.set_function(lambda: self.nbytes, cache=self.name)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not _MISSING
+
+    def _delete(self, key):
+        self.nbytes -= self._data.pop(key)[2]
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._delete(key)
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        """Возвращает значение и учитывает попадание/промах в метриках и трассе"""
+        value = self._lookup(key)
+        hit = value is not _MISSING
+        metrics.record_cache(self.name, hit)
+        if span := tracing.current_span():
+            span.set(cache='hit' if hit else 'miss')
+        return value if hit else default
+
+    def set(self, key, value, ttl=None):
+        if key in self._data:
+            self._delete(key)
+        size = records.nbytes(key) + records.nbytes(value) + ENTRY_OVERHEAD
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value, size)
+        self.nbytes += size
+        while len(self._data) > self.maxsize or (self.maxbytes and self.nbytes > self.maxbytes and len(self._data) > 1):
+            self._delete(next(iter(self._data)))
+
+    def expires_at(self, key):
+        entry = self._data.get(key)
+        return entry[0] if entry else None
+
+    def stats(self):
+        """Число записей, занятая память и средний размер записи"""
+        entries = len(self._data)
+        return {
+            'entries': entries,
+            'bytes': self.nbytes,
+            'bytes_per_entry': self.nbytes / entries if entries else 0,
+            'maxbytes': self.maxbytes,
+        }
+
+    def clear(self):
+        self._data.clear()
+        self._pending.clear()
+        self.nbytes = 0
+
+    def dump(self, file):
+        """Сохраняет живые записи в JSONL: [ключ, оставшийся TTL, запись]"""
+        now = time.monotonic()
+        count = 0
+        for key, (expires_at, value, _) in list(self._data.items()):
+            if expires_at > now and isinstance(value, records.Record):
+                file.write(json.dumps([key, expires_at - now, records.encode(value)], ensure_ascii=False) + '\n')
+                count += 1
+        return count
+
+    def load(self, file):
+        """Загружает записи, сохранённые dump (ключи-списки становятся кортежами)"""
+        count = 0
+        for line in file:
+            key, ttl, data = json.loads(line)
+            self.set(tuple(key) if isinstance(key, list) else key, records.decode(data), ttl)
+            count += 1
+        return count
+
+    def peek(self, key, default=None):
+        """Значение без учёта в метриках и без обновления порядка LRU"""
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    async def get_or_load(self, key, loader, cacheable=None, ttl=None):
+        """Возвращает значение из кэша или загружает его через корутину loader().
+
+        Одновременные запросы одного ключа ждут одну загрузку. Результат
+        кэшируется, если cacheable(result) истинно (по умолчанию — всегда).
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return await self.refresh(key, loader, cacheable, ttl)
+
+    async def refresh(self, key, loader, cacheable=None, ttl=None):
+        """Загружает значение заново, не заглядывая в кэш (старое остаётся до замены).
+
+        Загрузка идёт в отдельной задаче, которую все ожидающие защищают
+        shield: отмена одного из них (например, по бюджету времени плейлиста)
+        не прерывает загрузку для остальных.
+        """
+        task = self._pending.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._load(key, loader, cacheable, ttl))
+            self._pending[key] = task
+            task.add_done_callback(lambda done: self._loaded(key, done))
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader, cacheable, ttl):
+        value = await loader()
+        if cacheable is None or cacheable(value):
+            self.set(key, value, ttl)
+        return value
+
+    def _loaded(self, key, task):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        if not task.cancelled():
+            task.exception()  # исключение получат ожидающие, не логировать как забытое
+
+
+class Popularity:
+    """Частота запросов по ключам с экспоненциальным затуханием.
+
+    Хранит не больше maxsize ключей: при переполнении остаются самые частые.
+    """
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._counts = {}  # key -> [count, url]
+
+    def __len__(self):
+        return len(self._counts)
+
+    def record(self, key, url, weight=1.0):
+        entry = self._counts.get(key)
+        if entry is None:
+            self._counts[key] = [weight, url]
+            if len(self._counts) > self.maxsize * 2:
+                self._prune()
+        else:
+            entry[0] += weight
+
+    def count(self, key):
+        entry = self._counts.get(key)
+        return entry[0] if entry else 0.0
+
+    def _prune(self):
+        top = heapq.nlargest(self.maxsize, self._counts.items(), key=lambda item: item[1][0])
+        self._counts = dict(top)
+
+    def decay(self, factor):
+        """Умножает счётчики на factor и забывает ключи, почти не запрашиваемые"""
+        for key in list(self._counts):
+            entry = self._counts[key]
+            entry[0] *= factor
+            if entry[0] < 0.1:
+                del self._counts[key]
+
+    def top(self, n, min_count=0.0):
+        """Пары (ключ, url) самых популярных ключей, по убыванию частоты"""
+        top = heapq.nlargest(n, self._counts.items(), key=lambda item: item[1][0])
+        return [(key, url) for key, (count, url) in top if count >= min_count]
+
+    def clear(self):
+        self._counts.clear()
+
+
+def _is_tracking_param(name):
+    return name in TRACKING_PARAMS or name.startswith('utm_')
+
+
+def canonical_url(url):
+    """URL без fragment и меток отслеживания (?si=, utm_*); остальные параметры
+    сохраняются: у длинных ссылок onelink трек указан в query"""
+    parts = urlsplit(url.strip())
+    query = urlencode([
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    ])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), query, ''))
+
+
+def track_key(track_info):
+    """Канонический ключ трека для кэша результатов поиска"""
+    return search_key(track_info).key
+
+
+# Кэши разрешения ссылок: разбор исходной ссылки и поиск на других сервисах
+PARSE_CACHE = TTLCache('parse')
+FIND_CACHE = TTLCache('find')
+PARSE_CACHE.register_metrics()
+FIND_CACHE.register_metrics()
+# Частота запросов ссылок (по каноническому URL) для обновления кэша заранее
+POPULARITY = Popularity(int(os.getenv('POPULARITY_MAXSIZE', 1000)))
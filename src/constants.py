@@ -8,13 +8,16 @@ SERVICES = {
     'Spotify': {
         'name': '🟢 Spotify',
         'regex': SPOTIFY_REGEX,
+        'hosts': ('open.spotify.com', 'spotify.link'),
     },
     'YandexMusic': {
         'name': '🟠 Yandex Music',
         'regex': YANDEX_MUSIC_REGEX,
+        'hosts': ('music.yandex.ru',),
     },
     'MTS': {
         'name': '🟣 MTS Music',
         'regex': MTS_MUSIC_REGEX,
+        'hosts': ('mts-music-spo.onelink.me',),
     },
 }
\ No newline at end of file
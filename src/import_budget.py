@@ -0,0 +1,95 @@
+"""Отчёт о времени импорта при холодном старте и проверка бюджета.
+
+Запуск: python -m src.import_budget [--module api.webhook] [--budget-ms 800]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Модули, которые не должны импортироваться при холодном старте:
+# они подгружаются провайдерами по требованию (см. src/providers.py)
+LAZY_MODULES = ('aiohttp', 'bs4', 'yandex_music', 'spotipy', 'vk_api')
+
+DEFAULT_MODULE = 'api.webhook'
+DEFAULT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', 800))
+
+
+def measure_imports(module=DEFAULT_MODULE, python=sys.executable):
+    """Импортирует модуль в чистом интерпретаторе с -X importtime.
+
+    Возвращает список (модуль, собственное время мкс, накопленное мкс, глубина)
+    для всех импортированных модулей в порядке завершения импорта.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'Не удалось импортировать {module}: {proc.stderr.strip()[-500:]}')
+    return parse_importtime(proc.stderr)
+
+
+def parse_importtime(output):
+    """Разбирает вывод -X importtime"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # строка заголовка
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(parts[0]), int(parts[1]), depth))
+    return rows
+
+
+def top_level_breakdown(rows):
+    """Суммирует собственное время импорта по пакетам верхнего уровня (мс)"""
+    totals = {}
+    for name, self_us, _, _ in rows:
+        package = name.split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def check_budget(rows, budget_ms=DEFAULT_BUDGET_MS, lazy_modules=LAZY_MODULES):
+    """Возвращает список нарушений бюджета (пустой, если всё в порядке)"""
+    problems = []
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+    if total_ms > budget_ms:
+        problems.append(f'Суммарное время импорта {total_ms:.1f} мс превышает бюджет {budget_ms:.0f} мс')
+    imported = {name.split('.')[0] for name, _, _, _ in rows}
+    for module in lazy_modules:
+        if module in imported:
+            problems.append(f'Модуль {module} импортируется при холодном старте')
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cold-start import time report')
+    parser.add_argument('--module', default=DEFAULT_MODULE)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args(argv)
+
+    rows = measure_imports(args.module)
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+
+    print(f'Импорт {args.module}: {total_ms:.1f} мс (бюджет {args.budget_ms:.0f} мс)')
+    for package, ms in top_level_breakdown(rows)[:args.top]:
+        print(f'  {package:<30} {ms:8.1f} мс')
+
+    problems = check_budget(rows, args.budget_ms)
+    for problem in problems:
+        print(f'FAIL: {problem}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
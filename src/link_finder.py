@@ -1,7 +1,16 @@
 import os
+import asyncio
+import logging
+import urllib.parse
 from .constants import SERVICES
 from abc import ABC, abstractmethod
-from .logger import log_async_method
+from .logger import log_async_method, LazyRepr
+from .providers import ProviderMap
+from . import metrics, tracing, ratelimit, records
+from .cache import FIND_CACHE, track_key
+from .search_key import search_key
+
+logger = logging.getLogger(__name__)
 
 class Finder(ABC):
     """Абстрактный базовый класс для парсеров"""
@@ -13,6 +22,13 @@ class Finder(ABC):
     async def find(self, track_info):
         """Ищет ссылку и возвращает данные о треке"""
         pass
+    
+    def fallback(self, track_info):
+        """Ответ без запроса к сервису (ссылка на страницу поиска, если она есть)"""
+        return {
+            'service': self.service['name'],
+            'url': None,
+        }
 
 class SpotifyFinder(Finder):
     @log_async_method
@@ -27,8 +43,10 @@ class SpotifyFinder(Finder):
             )
             sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
             
-            query = f"{track_info['artists']} - {track_info['title']}"
-            results = sp.search(q=query, type='track', limit=1)
+            query = search_key(track_info).query
+            with tracing.span('sdk', upstream='spotify.search'):
+                # SDK блокирующий: выполняем в потоке, чтобы не останавливать event loop
+                results = await asyncio.to_thread(sp.search, q=query, type='track', limit=1)
             items = results.get('tracks', {}).get('items', [])
             
             if items:
@@ -44,34 +62,40 @@ class SpotifyFinder(Finder):
                 'url': None,
             }
         except Exception as e:
-            print(f"Error Finding Spotify: {e}")
+            logger.warning('Error Finding Spotify: %s', e)
             return {
                 'url': None,
                 'error': str(e),
                 'service': self.service['name'],
             }
     
+def _yandex_search(client_class, token, track_name):
+    client = client_class(token).init()
+    return client.search(track_name, type_='track', page=0, playlist_in_best=True)
+
 class YandexFinder(Finder):
+    def fallback(self, track_info):
+        return {
+            'service': self.service['name'],
+            'url': f'https://music.yandex.ru/search?text={urllib.parse.quote(search_key(track_info).query)}',
+            'fallback': True,
+        }
+    
     @log_async_method
     async def find(self, track_info):
         try:
             from yandex_music import Client
-            import urllib.parse
             
             token = os.getenv("YANDEX_MUSIC_TOKEN")
             if not token:
                 # Если токен не установлен, возвращаем ссылку на поиск
-                track_name = f"{track_info['artists']} - {track_info['title']}"
-                return {
-                    'service': self.service['name'],
-                    'url': f'https://music.yandex.ru/search?text={urllib.parse.quote(track_name)}',
-                }
+                return self.fallback(track_info)
             
-            client = Client(token).init()
-            track_name = f"{track_info['artists']} - {track_info['title']}"
+            track_name = search_key(track_info).query
             
             try:
-                search_result = client.search(track_name, type_='track', page=0, playlist_in_best=True)
+                with tracing.span('sdk', upstream='yandex_music.search'):
+                    search_result = await asyncio.to_thread(_yandex_search, Client, token, track_name)
                 
                 # Пытаемся найти трек в результатах поиска
                 if search_result and search_result.tracks:
@@ -99,34 +123,30 @@ class YandexFinder(Finder):
                                     'url': url,
                                 }
                     except Exception as best_error:
-                        print(f"Error processing best result: {best_error}")
+                        logger.warning('Error processing best result: %s', best_error)
                         # Продолжаем выполнение
                         pass
                         
             except Exception as search_error:
-                print(f"Error in Yandex search: {search_error}")
+                logger.warning('Error in Yandex search: %s', search_error)
                 # Возвращаем ссылку на поиск при ошибке
                 pass
 
             # Если ничего не нашли, возвращаем ссылку на поиск
-            return {
-                'service': self.service['name'],
-                'url': f'https://music.yandex.ru/search?text={urllib.parse.quote(track_name)}',
-            }
+            return self.fallback(track_info)
         except Exception as e:
-            print(f"Error Finding Yandex: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Error Finding Yandex: %s', e)
             # При любой ошибке возвращаем ссылку на поиск вместо None
-            track_name = f"{track_info['artists']} - {track_info['title']}"
-            import urllib.parse
-            return {
-                'service': self.service['name'],
-                'url': f'https://music.yandex.ru/search?text={urllib.parse.quote(track_name)}',
-                'error': str(e),
-            }
+            return dict(self.fallback(track_info), error=str(e))
         
 class MTSFinder(Finder):
+    def fallback(self, track_info):
+        return {
+            'url': f"https://music.mts.ru/search?text={urllib.parse.quote(search_key(track_info).query)}",
+            'fallback': True,
+            'service': self.service['name'],
+        }
+    
     @log_async_method
     async def find(self, track_info):
         try:
@@ -134,11 +154,14 @@ class MTSFinder(Finder):
             vk_session = VkApi(token=os.getenv("MTS_VK_TOKEN"))
             vk = vk_session.get_api()
             
-            search_result = vk.audio.search(q=f"{track_info['artists']} - {track_info['title']}", count=1)
+            with tracing.span('sdk', upstream='vk.audio.search'):
+                search_result = await asyncio.to_thread(
+                    vk.audio.search, q=search_key(track_info).query, count=1
+                )
             if search_result['items']:
                 track = search_result['items'][0]
                 url = track.get('url')
-                print(f"Found MTS track URL: {url}, {track}")
+                logger.debug('Found MTS track URL: %s, %s', url, LazyRepr(track))
                 return {
                     'service': self.service['name'],
                     'url': url,
@@ -147,34 +170,80 @@ class MTSFinder(Finder):
                 'service': self.service['name'],
             }   
         except Exception as e:
-            print(f"Error Finding MTS: {e}")
-            return {
-                'url': f'https://music.mts.ru/search?text={track_info['artists']} - {track_info['title']}',
-                'error': str(e),
-                'service': self.service['name'],
-            }
+            logger.warning('Error Finding MTS: %s', e)
+            return dict(self.fallback(track_info), error=str(e))
+
+def _is_cacheable(result):
+    return bool(result.get('url')) and not result.get('error')
 
 class LinkFinder:
-    def __init__(self):
+    def __init__(self, cache=FIND_CACHE):
         self.services = SERVICES
-        self.finders = {
-            'Spotify': SpotifyFinder(self.services['Spotify']),
-            'YandexMusic': YandexFinder(self.services['YandexMusic']),
-            'MTS': MTSFinder(self.services['MTS']),
-        }
+        # Сервисы поиска создаются по требованию
+        self.finders = ProviderMap('finder', self.services)
+        self.cache = cache
+    
+    async def _find(self, name, finder, track_info):
+        async with ratelimit.limiter(name):
+            with metrics.FIND_SECONDS.time(service=name):
+                result = records.link_result(await finder.find(track_info))
+        span = tracing.current_span()
+        if result.get('error'):
+            metrics.ERRORS.inc(stage='find', service=name)
+            if span:
+                span.record_error(result['error'])
+        if result.get('fallback'):
+            metrics.FALLBACKS.inc(stage='find', service=name)
+            if span:
+                span.set(fallback=True)
+        return result
+    
+    async def _find_cached(self, name, finder, track_info):
+        key = search_key(track_info)
+        if not key.title:
+            # Название неизвестно (заглушка парсера): пустой запрос к сервису
+            # бессмыслен, а общий ключ кэша склеил бы все такие треки
+            return records.link_result(finder.fallback(track_info))
+        cache_key = (name, key.key)
+        metrics.record_normalization(self.cache.name, key.rules, cache_key in self.cache)
+        with tracing.span('find', service=name):
+            return await self.cache.get_or_load(
+                cache_key,
+                lambda: self._find(name, finder, track_info),
+                cacheable=_is_cacheable,
+            )
+    
+    def _targets(self, track_info):
+        original = records.service_id(track_info['original_service'])
+        return [(name, finder) for name, finder in self.finders.items() if name != original]
+    
+    async def refresh(self, track_info, expiring_before):
+        """Ищет заново ссылки, запись кэша которых истекает раньше expiring_before"""
+        refreshed = 0
+        if not search_key(track_info).title:
+            return refreshed
+        for name, finder in self._targets(track_info):
+            key = (name, track_key(track_info))
+            expires_at = self.cache.expires_at(key)
+            if expires_at is not None and expires_at > expiring_before:
+                continue
+            metrics.CACHE_REFRESHES.inc(cache=self.cache.name)
+            await self.cache.refresh(key, lambda: self._find(name, finder, track_info), cacheable=_is_cacheable)
+            refreshed += 1
+        return refreshed
         
     @log_async_method
     async def find_link(self, track_info):
         try:
-            results = []
-            for name, finder in self.finders.items():
-                if track_info.get('original_service').get('name') != finder.service["name"]:
-                    result = await finder.find(track_info)
-                    results.append(result)
-            return results
+            # Поиск по всем сервисам, кроме исходного, выполняется параллельно
+            return list(await asyncio.gather(*(
+                self._find_cached(name, finder, track_info)
+                for name, finder in self._targets(track_info)
+            )))
                 
         except Exception as e:
-            print(f'Error parsing link: {e}')
+            logger.warning('Error finding links: %s', e)
+            metrics.ERRORS.inc(stage='find', service='all')
             return {'error': 'Failed to parse link'}
         
 # Для совместимости (асинхронная версия)
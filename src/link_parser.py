@@ -1,10 +1,16 @@
 import os
+import re
 import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
+import logging
 from abc import ABC, abstractmethod
 from .constants import SERVICES
-from .logger import log_method, log_async_method
+from .logger import log_async_method
+from .providers import ProviderMap
+from .router import ROUTER
+from . import metrics, tracing, ratelimit, records
+from .cache import PARSE_CACHE, POPULARITY, canonical_url
+
+logger = logging.getLogger(__name__)
 
 class Parser(ABC):
     """Абстрактный базовый класс для парсеров"""
@@ -20,9 +26,13 @@ class Parser(ABC):
 class SpotifyParser(Parser):
     @log_async_method
     async def parse(self, url):
+        import aiohttp
+        from bs4 import BeautifulSoup
+
         async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers={'User-Agent': 'TelegramBot (like Twitterbot) Android'}) as response:
-                html = await response.text()
+            with tracing.span('http', upstream='open.spotify.com'):
+                async with session.get(url, headers={'User-Agent': 'TelegramBot (like Twitterbot) Android'}) as response:
+                    html = await response.text()
         
         soup = BeautifulSoup(html, 'html.parser')
         
@@ -39,12 +49,15 @@ class SpotifyParser(Parser):
             'artists': artists,
         }
 
+def _yandex_track(client_class, track_id):
+    client = client_class(os.getenv("YANDEX_MUSIC_TOKEN")).init()
+    return client.tracks([track_id])[0]
+
 class YandexParser(Parser):
     @log_async_method
     async def parse(self, url):
         try:
             # Извлечь track_id из URL
-            import re
             match = re.search(r'/track/(\d+)', url)
             if not match:
                 return {
@@ -55,11 +68,12 @@ class YandexParser(Parser):
                 }
                 
             track_id = match.group(1)
-            print(f"Extracted track_id: {track_id}")
+            logger.debug('Extracted track_id: %s', track_id)
             
             from yandex_music import Client
-            client = Client(os.getenv("YANDEX_MUSIC_TOKEN")).init()
-            track = client.tracks([track_id])[0]
+            with tracing.span('sdk', upstream='yandex_music.tracks'):
+                # SDK блокирующий: выполняем в потоке, чтобы не останавливать event loop
+                track = await asyncio.to_thread(_yandex_track, Client, track_id)
             title = track.title
             artists = ', '.join(name.name for name in track.artists)
             
@@ -70,7 +84,7 @@ class YandexParser(Parser):
                 'artists': artists,
             }
         except Exception as e:
-            print(f"Error parsing Yandex: {e}")
+            logger.warning('Error parsing Yandex: %s', e)
             return {
                 'url': url,
                 'original_service': self.service,
@@ -82,6 +96,9 @@ class MTSParser(Parser):
     @log_async_method
     async def parse(self, url):
         try:
+            import aiohttp
+            from bs4 import BeautifulSoup
+
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -90,21 +107,26 @@ class MTSParser(Parser):
                 'Connection': 'keep-alive',
                 'Upgrade-Insecure-Requests': '1',
             }
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, allow_redirects=True) as response:
-                    final_url = str(response.url)
+            with tracing.span('http', upstream='mts-music-spo.onelink.me'):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(url, headers=headers, allow_redirects=True) as response:
+                        final_url = str(response.url)
                     
-                    # Извлечь deep_link_value из URL
-                    from urllib.parse import parse_qs, urlparse
-                    parsed = urlparse(final_url)
-                    query = parse_qs(parsed.query)
-                    deep_link = query.get('deep_link_value', [None])[0]
-                    if deep_link:
-                        deep_link = deep_link.replace('%3A', ':').replace('%2F', '/')
-                        async with session.get(deep_link, headers=headers) as track_response:
-                            html = await track_response.text()
-                    else:
-                        html = await response.text()
+                        # Извлечь deep_link_value из URL
+                        from urllib.parse import parse_qs, urlparse
+                        parsed = urlparse(final_url)
+                        query = parse_qs(parsed.query)
+                        deep_link = query.get('deep_link_value', [None])[0]
+                        if deep_link:
+                            deep_link = deep_link.replace('%3A', ':').replace('%2F', '/')
+                            if re.search(r'/(album|playlist)/', urlparse(deep_link).path):
+                                # Список треков МТС Музыки со страницы не получить
+                                return {'error': 'MTS Music playlists are not supported'}
+                            with tracing.span('http', upstream=urlparse(deep_link).hostname):
+                                async with session.get(deep_link, headers=headers) as track_response:
+                                    html = await track_response.text()
+                        else:
+                            html = await response.text()
             
             soup = BeautifulSoup(html, 'html.parser')
             
@@ -137,7 +159,7 @@ class MTSParser(Parser):
                 'artists': artists,
             }
         except Exception as e:
-            print(f"Error parsing MTS: {e}")
+            logger.warning('Error parsing MTS: %s', e)
             return {
                 'url': url,
                 'original_service': self.service,
@@ -145,25 +167,58 @@ class MTSParser(Parser):
                 'artists': 'Unknown Artist',
             }
 
+def _is_cacheable(result):
+    return bool(result) and 'error' not in result and result.get('title') != 'Unknown Title'
+
 class LinkParser:
-    def __init__(self):
+    def __init__(self, cache=PARSE_CACHE, popularity=POPULARITY):
         self.services = SERVICES
-        self.parsers = {
-            'Spotify': SpotifyParser(self.services['Spotify']),
-            'YandexMusic': YandexParser(self.services['YandexMusic']),
-            'MTS': MTSParser(self.services['MTS']),
-        }
+        # Парсеры создаются (и их зависимости импортируются) по требованию
+        self.parsers = ProviderMap('parser', self.services)
+        self.cache = cache
+        self.popularity = popularity
+    
+    async def _parse(self, name, url):
+        async with ratelimit.limiter(name):
+            with metrics.PARSE_SECONDS.time(service=name):
+                result = records.track_info(await self.parsers[name].parse(url))
+        if result and result.get('title') == 'Unknown Title':
+            metrics.FALLBACKS.inc(stage='parse', service=name)
+            if span := tracing.current_span():
+                span.set(fallback=True)
+        return result
+    
+    def match(self, url):
+        """Имя сервиса, к которому относится ссылка, или None"""
+        name = ROUTER.route(url)
+        return name if name in self.parsers else None
     
     @log_async_method
     async def parse_link(self, url):
+        name = None
         try:
-            for name, parser in self.parsers.items():
-                if parser.service['regex'].match(url):
-                    return await parser.parse(url)
-            return None
+            name = self.match(url)
+            if name is None:
+                return None
+            key = canonical_url(url)
+            self.popularity.record(key, url)
+            with tracing.span('parse', service=name):
+                # Разбирается канонический URL: запись кэша общая для всех, и в
+                # ответ не должны попасть метки шаринга (?si=) первого отправителя
+                return await self.cache.get_or_load(key, lambda: self._parse(name, key), cacheable=_is_cacheable)
         except Exception as e:
-            print(f'Error parsing link: {e}')
+            logger.warning('Error parsing link: %s', e)
+            metrics.ERRORS.inc(stage='parse', service=name or 'unknown')
             return {'error': 'Failed to parse link'}
+    
+    async def refresh(self, url):
+        """Разбирает ссылку заново и обновляет запись кэша"""
+        name = self.match(url)
+        if name is None:
+            return None
+        metrics.CACHE_REFRESHES.inc(cache=self.cache.name)
+        key = canonical_url(url)
+        return await self.cache.refresh(key, lambda: self._parse(name, key), cacheable=_is_cacheable)
 
 # Для совместимости (асинхронная версия)
 async def parse_link(url):
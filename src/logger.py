@@ -1,56 +1,170 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import reprlib
 import time
 from functools import wraps
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Доля записываемых событий о завершении методов (высокочастотные события)
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 1.0))
+# Медленные вызовы логируются всегда, независимо от сэмплирования
+LOG_SLOW_SECONDS = float(os.getenv('LOG_SLOW_SECONDS', 1.0))
+
+# Ограниченный repr аргументов: Update и большие словари не рендерятся целиком
+_arg_repr = reprlib.Repr()
+_arg_repr.maxstring = 120
+_arg_repr.maxother = 120
+_arg_repr.maxdict = 8
+_arg_repr.maxlist = 8
+_arg_repr.maxlevel = 3
+
+_listener = None
+
+
+class LazyRepr:
+    """Откладывает построение repr до момента форматирования записи"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return _arg_repr.repr(self.value)
+
+
+class LazyFields:
+    """Рендерит поля структурированного события как key=value при форматировании"""
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return ' '.join(f'{key}={_arg_repr.repr(value)}' for key, value in self.fields.items())
+
+
+# Аргументы, которые можно отдать в поток QueueListener без копирования
+_IMMUTABLE_ARGS = (str, int, float, bool, bytes, type(None))
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не форматирует запись в потоке event loop.
+
+    Неизменяемые аргументы (строки, числа) передаются как есть и
+    подставляются в сообщение в потоке QueueListener. Остальные, в том
+    числе LazyRepr/LazyFields, намеренно рендерятся здесь: объекты под
+    ними (Update, словари) могут измениться до форматирования, поэтому
+    сообщение фиксируется в момент записи. До этого доходит только
+    запись, прошедшая проверку уровня.
+    """
+
+    def prepare(self, record):
+        # Копия: исходную запись видят остальные обработчики логгера
+        record = copy.copy(record)
+        if isinstance(record.args, tuple) and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in record.args):
+            record.msg = str(record.msg)
+        else:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def setup_logging(level=LOG_LEVEL, handlers=None):
+    """Настраивает логирование через неблокирующую очередь (один раз)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    if not handlers:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers = [stream_handler]
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def log_event(logger, event, level=logging.INFO, sample_rate=1.0, **fields):
+    """Пишет структурированное событие; поля рендерятся только если запись попадёт в лог"""
+    if not logger.isEnabledFor(level):
+        return
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    logger.log(level, '%s %s', event, LazyFields(fields), extra={'event': event, 'fields': fields})
+
+
+def _log_call(logger, prefix, name, args, kwargs):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('%s %s с args=%s, kwargs=%s', prefix, name, LazyRepr(args[1:]), LazyRepr(kwargs))
+
+
+def _log_done(logger, prefix, name, execution_time):
+    if execution_time >= LOG_SLOW_SECONDS:
+        logger.warning('%s %s выполнен за %.2f сек (медленно)', prefix, name, execution_time)
+    elif logger.isEnabledFor(logging.INFO) and (LOG_SAMPLE_RATE >= 1.0 or random.random() < LOG_SAMPLE_RATE):
+        logger.info('%s %s выполнен за %.2f сек', prefix, name, execution_time)
 
-# Отключаем подробные логи httpx (запросы polling)
-logging.getLogger('httpx').setLevel(logging.WARNING)
 
 def log_method(func):
     """Декоратор для логирования вызовов методов"""
+    logger = logging.getLogger(func.__module__)
+    name = func.__name__
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        logger = logging.getLogger(func.__module__)
-        
-        # Логируем вызов
-        logger.info(f"Вызов метода {func.__name__} с args={args[1:]}, kwargs={kwargs}")
-        
+        _log_call(logger, 'Вызов метода', name, args, kwargs)
+        start_time = time.perf_counter()
         try:
             result = func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            logger.info(f"Метод {func.__name__} выполнен за {execution_time:.2f} сек")
-            return result
         except Exception as e:
-            execution_time = time.time() - start_time
-            logger.error(f"Ошибка в методе {func.__name__} за {execution_time:.2f} сек: {e}")
+            execution_time = time.perf_counter() - start_time
+            logger.error('Ошибка в методе %s за %.2f сек: %s', name, execution_time, e)
             raise
-    
+        _log_done(logger, 'Метод', name, time.perf_counter() - start_time)
+        return result
+
     return wrapper
 
 # Для асинхронных методов
 def log_async_method(func):
     """Декоратор для логирования асинхронных методов"""
+    logger = logging.getLogger(func.__module__)
+    name = func.__name__
+
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        start_time = time.time()
-        logger = logging.getLogger(func.__module__)
-        
-        logger.info(f"Асинхронный вызов метода {func.__name__} с args={args[1:]}, kwargs={kwargs}")
-        
+        _log_call(logger, 'Асинхронный вызов метода', name, args, kwargs)
+        start_time = time.perf_counter()
         try:
             result = await func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            logger.info(f"Асинхронный метод {func.__name__} выполнен за {execution_time:.2f} сек")
-            return result
         except Exception as e:
-            execution_time = time.time() - start_time
-            logger.error(f"Ошибка в асинхронном методе {func.__name__} за {execution_time:.2f} сек: {e}")
+            execution_time = time.perf_counter() - start_time
+            logger.error('Ошибка в асинхронном методе %s за %.2f сек: %s', name, execution_time, e)
             raise
-    
-    return wrapper
\ No newline at end of file
+        _log_done(logger, 'Асинхронный метод', name, time.perf_counter() - start_time)
+        return result
+
+    return wrapper
+
+
+# Настройка логирования
+setup_logging()
+
+# Отключаем подробные логи httpx (запросы polling)
+logging.getLogger('httpx').setLevel(logging.WARNING)
@@ -1,7 +1,118 @@
-import re
+import os
+from .cache import TTLCache
+from .constants import SERVICES
+from .records import LinkResult, TrackInfo, link_result, track_info
+from .router import ROUTER
+from . import tracing
+
+# Символы, которые MarkdownV2 требует экранировать в тексте и в URL ссылок
+_TEXT_ESCAPES = str.maketrans({c: '\\' + c for c in '\\_*[]()~`>#+-=|{}.!'})
+_URL_ESCAPES = str.maketrans({')': '\\)', '\\': '\\\\'})
+
+# Шаблоны ответа (MarkdownV2)
+TRACK_TEMPLATE = '*{artists}* \\- {title}\n'
+LINK_TEMPLATE = '[{service}]({url})\n'
+INLINE_LINK_TEMPLATE = '[{service}]({url})'
+
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', 10000))
+
 
 def escape_markdown(text):
     if not text:
         return 'N/A'
     # Экранируем специальные символы Markdown
-    return re.sub(r'([*_`\[\]()~>#+-=|{}.!])', r'\\\1', text)
\ No newline at end of file
+    return text.translate(_TEXT_ESCAPES)
+
+
+def escape_url(url):
+    """Экранирование URL внутри (...) ссылки MarkdownV2"""
+    return url.translate(_URL_ESCAPES)
+
+
+def _track_records(data, links):
+    """Данные трека и найденные ссылки в виде записей (словари преобразуются)"""
+    if not isinstance(data, TrackInfo):
+        if isinstance(data, dict) and 'original_service' not in data:
+            # Исходный сервис не указан: определяем его по ссылке
+            service = ROUTER.route(data.get('url') or '')
+            if service is None:
+                raise ValueError(f"Unknown source service for track URL: {data.get('url')!r}")
+            data = dict(data, original_service=service)
+        data = track_info(data)
+        if not isinstance(data, TrackInfo):
+            raise ValueError(f'Not a parsed track: {data!r}')
+    if not isinstance(links, list):
+        return data, ()
+    found = tuple(
+        link for link in (item if isinstance(item, LinkResult) else link_result(item) for item in links)
+        if link.url
+    )
+    return data, found
+
+
+class TrackRenderer:
+    """Общий рендерер ответов с кэшем готовых сообщений.
+
+    Ключ кэша — все данные, попадающие в сообщение: трек, исходный сервис и
+    набор найденных ссылок. Строки в ключе — те же объекты из кэшей разбора
+    и поиска, поэтому их хэши уже посчитаны и поиск дешевле рендеринга.
+    """
+
+    def __init__(self, maxsize=RENDER_CACHE_SIZE):
+        self.cache = TTLCache('render', maxsize=maxsize) if maxsize else None
+        # Экранированные названия сервисов
+        self._labels = {}
+
+    def _label(self, service):
+        label = self._labels.get(service)
+        if label is None:
+            label = self._labels[service] = escape_markdown(SERVICES[service]['name'])
+        return label
+
+    def _cached(self, kind, data, links, render):
+        data, found = _track_records(data, links)
+        if self.cache is None:
+            return render(data, found)
+        key = (kind, data.service, data.url, data.title, data.artists, tuple((link.service, link.url) for link in found))
+        with tracing.span('render', kind=kind):
+            text = self.cache.get(key)
+            if text is None:
+                text = render(data, found)
+                self.cache.set(key, text)
+        return text
+
+    def _render_track(self, data, found):
+        parts = [
+            TRACK_TEMPLATE.format(artists=escape_markdown(data.artists), title=escape_markdown(data.title)),
+            LINK_TEMPLATE.format(service=self._label(data.service), url=escape_url(data.url)),
+        ]
+        parts.extend(LINK_TEMPLATE.format(service=self._label(link.service), url=escape_url(link.url)) for link in found)
+        return ''.join(parts)
+
+    def _render_collection_track(self, data, found):
+        services = [INLINE_LINK_TEMPLATE.format(service=self._label(data.service), url=escape_url(data.url))]
+        services.extend(
+            INLINE_LINK_TEMPLATE.format(service=self._label(link.service), url=escape_url(link.url)) for link in found
+        )
+        title = TRACK_TEMPLATE.format(artists=escape_markdown(data.artists), title=escape_markdown(data.title))
+        return f"{title}{' '.join(services)}\n\n"
+
+    def _render_text(self, data, found):
+        lines = [f'{data.artists} - {data.title}', f"  {SERVICES[data.service]['name']}: {data.url}"]
+        lines.extend(f'  {link.service_name}: {link.url}' for link in found)
+        return '\n'.join(lines) + '\n\n'
+
+    def track(self, data, links):
+        """Ответ на ссылку: название и ссылки на сервисы по строкам (MarkdownV2)"""
+        return self._cached('track', data, links, self._render_track)
+
+    def collection_track(self, data, links):
+        """Трек плейлиста: строка с названием и строка ссылок (MarkdownV2)"""
+        return self._cached('collection', data, links, self._render_collection_track)
+
+    def text(self, data, links):
+        """Трек плейлиста для текстового файла (без разметки, не кэшируется)"""
+        return self._render_text(*_track_records(data, links))
+
+
+RENDERER = TrackRenderer()
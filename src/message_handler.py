@@ -1,9 +1,38 @@
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
 from telegram import Update, InlineQueryResultArticle, InputTextMessageContent
 from telegram.ext import CommandHandler, MessageHandler, filters, ContextTypes, InlineQueryHandler
 from .link_parser import parse_link
-from .markdown import escape_markdown
-from .logger import log_async_method
+from .markdown import RENDERER
+from .router import ROUTER
+from .logger import log_async_method, LazyRepr
 from .link_finder import find_link
+from .playlist import CollectionResolver, PLAYLIST_CHAT_TRACKS
+from . import metrics, tracing, profiler
+
+logger = logging.getLogger(__name__)
+
+# Максимальная длина сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+@contextmanager
+def _telegram_call(method):
+    """Замер вызова Telegram API: метрика и участок трассы"""
+    with metrics.TELEGRAM_SECONDS.time(method=method), tracing.span('telegram', method=method):
+        yield
+
+def _parse_admin_ids(value):
+    """Идентификаторы из ADMIN_IDS; некорректные записи пропускаются с предупреждением"""
+    admin_ids = set()
+    for user_id in filter(None, (part.strip() for part in value.split(','))):
+        try:
+            admin_ids.add(int(user_id))
+        except ValueError:
+            logger.warning('Invalid ADMIN_IDS entry skipped: %r', user_id)
+    return admin_ids
+
 
 class BotHandlers:
     """Класс для обработки сообщений Telegram-бота"""
@@ -17,6 +46,12 @@ class BotHandlers:
             'Please send a valid music track link from Spotify, Yandex Music, or MTS Music.'
         )
         self.error_message = 'Error parsing the link.'
+        self.playlist_error_message = 'Playlist is empty or unavailable.'
+        self.playlist_inline_message = 'Send the playlist link to the bot in a private chat to convert it.'
+        self.collections = CollectionResolver()
+        self.profile_usage = 'Usage: /profile <seconds> or /profile updates <count>'
+        # Пользователи, которым доступны служебные команды (/profile)
+        self.admin_ids = _parse_admin_ids(os.getenv('ADMIN_IDS', ''))
     
     @log_async_method
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -24,38 +59,95 @@ class BotHandlers:
         await update.message.reply_text(self.welcome_message)
     
     @log_async_method
+    @metrics.timed_async(metrics.UPDATE_SECONDS, handler='message')
+    @tracing.trace_update('message')
+    @profiler.profile_update
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик текстовых сообщений"""
         text = update.message.text
         chat_id = update.message.chat_id
         
-        # Проверяем, есть ли URL
-        import re
-        url_regex = re.compile(r'https?://[^\s]+')
-        match = url_regex.search(text)
+        # Ищем ссылку на поддерживаемый сервис (посторонние ссылки отбрасываются по хосту)
+        link = ROUTER.first_supported(text)
         
-        if match:
-            parsing_msg = await update.message.reply_text('🎶Parsing your link\\.\\.\\.', parse_mode='MarkdownV2')
+        if link:
+            _, url = link
+            job = self.collections.start(url)
+            if job is not None:
+                await self._send_collection(update.message, job)
+                return
             
-            data = await parse_link(match.group(0))
-            links = await find_link(data)
-            print(f'Parsed data: {data}, links: {links}')
+            with _telegram_call('send_message'):
+                parsing_msg = await update.message.reply_text('🎶Parsing your link\\.\\.\\.', parse_mode='MarkdownV2')
             
+            data = await parse_link(url)
             if 'error' in data:
-                await parsing_msg.edit_text(self.error_message)
+                with _telegram_call('edit_message'):
+                    await parsing_msg.edit_text(self.error_message)
                 return
             
-            response = f"*{escape_markdown(data['artists'])}* \\- {escape_markdown(data['title'])}\n"
-            response += f'[{escape_markdown(data["original_service"]["name"])}]({data["url"]})\n'
-            for link_info in links:
-                if link_info.get('url'):
-                    response += f'[{escape_markdown(link_info["service"])}]({link_info["url"]})\n'  
-
-            await parsing_msg.edit_text(response, parse_mode='MarkdownV2')
+            links = await find_link(data)
+            logger.debug('Parsed data: %s, links: %s', LazyRepr(data), LazyRepr(links))
+            
+            with _telegram_call('edit_message'):
+                await parsing_msg.edit_text(RENDERER.track(data, links), parse_mode='MarkdownV2')
         else:
-            await update.message.reply_text(self.invalid_message)
+            with _telegram_call('send_message'):
+                await update.message.reply_text(self.invalid_message)
+            
+    async def _send_collection(self, message, job):
+        """Отправляет плейлист по мере разрешения: сообщениями или файлом для длинных списков"""
+        with _telegram_call('send_message'):
+            status_msg = await message.reply_text('🎶Resolving playlist\\.\\.\\.', parse_mode='MarkdownV2')
+        
+        chunk = ''
+        document = None
+        try:
+            async for data, links in job.results():
+                if document is None and job.total > PLAYLIST_CHAT_TRACKS:
+                    # Файл пишется на диск по мере разрешения, а не собирается в памяти
+                    document = tempfile.TemporaryFile()
+                if document is not None:
+                    document.write(RENDERER.text(data, links).encode())
+                    continue
+                entry = RENDERER.collection_track(data, links)
+                if len(chunk) + len(entry) > MESSAGE_LIMIT:
+                    with _telegram_call('send_message'):
+                        await message.reply_text(chunk, parse_mode='MarkdownV2', disable_web_page_preview=True)
+                    chunk = ''
+                chunk += entry
             
-    @log_async_method        
+            if chunk:
+                with _telegram_call('send_message'):
+                    await message.reply_text(chunk, parse_mode='MarkdownV2', disable_web_page_preview=True)
+            if document is not None:
+                document.seek(0)
+                with _telegram_call('send_document'):
+                    await message.reply_document(document, filename='playlist.txt')
+        except Exception as e:
+            logger.warning('Error resolving playlist: %s', e)
+            with _telegram_call('edit_message'):
+                await status_msg.edit_text(self.error_message)
+            return
+        finally:
+            if document is not None:
+                document.close()
+        
+        if not job.resolved:
+            summary = self.playlist_error_message
+        else:
+            summary = f'Resolved {job.resolved} of {job.total} tracks.'
+            if job.truncated == 'limit':
+                summary += f' Only the first {job.max_tracks} tracks are converted.'
+            elif job.truncated == 'time':
+                summary += ' Time limit reached.'
+        with _telegram_call('edit_message'):
+            await status_msg.edit_text(summary)
+    
+    @log_async_method
+    @metrics.timed_async(metrics.UPDATE_SECONDS, handler='inline_query')
+    @tracing.trace_update('inline_query')
+    @profiler.profile_update
     async def inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик inline-запросов"""
         query = update.inline_query.query
@@ -63,38 +155,71 @@ class BotHandlers:
         if not query:
             return
         
-        import re
-        url_regex = re.compile(r'https?://[^\s]+')
-        match = url_regex.search(query)
+        link = ROUTER.first_supported(query)
+        if not link:
+            return
         
-        if match:
-            data = await parse_link(query)
-            links = await find_link(data)
-            print(f'Parsed data: {data}, links: {links}')
-            
-            response = f"*{escape_markdown(data['artists'])}* \\- {escape_markdown(data['title'])}\n"
-            response += f'[{escape_markdown(data["original_service"]["name"])}]({data["url"]})\n'
-            for link_info in links:
-                if link_info.get('url'):
-                    response += f'[{escape_markdown(link_info["service"])}]({link_info["url"]})\n'  
-            
-            results = [(
+        # Плейлист не уложить в один inline-ответ: предлагаем отправить его в чат
+        if self.collections.match(link[1]) is not None:
+            results = [
                 InlineQueryResultArticle(
                     id='1',
-                    title=f'{escape_markdown(data["title"])}',
-                    input_message_content=InputTextMessageContent(
-                        response,
-                        parse_mode='MarkdownV2'
-                    ),
-                    description='Get multi-links for the track',
+                    title='Playlists are converted in chat',
+                    input_message_content=InputTextMessageContent(link[1]),
+                    description=self.playlist_inline_message,
                 )
-            )]
+            ]
+            with _telegram_call('answer_inline_query'):
+                await update.inline_query.answer(results)
+            return
+        
+        data = await parse_link(link[1])
+        if not data or 'error' in data:
+            return
+        links = await find_link(data)
+        logger.debug('Parsed data: %s, links: %s', LazyRepr(data), LazyRepr(links))
+        
+        results = [
+            InlineQueryResultArticle(
+                id='1',
+                title=data['title'],
+                input_message_content=InputTextMessageContent(
+                    RENDERER.track(data, links),
+                    parse_mode='MarkdownV2'
+                ),
+                description='Get multi-links for the track',
+            )
+        ]
+        
+        with _telegram_call('answer_inline_query'):
+            await update.inline_query.answer(results)
+    
+    @log_async_method
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /profile (только для администраторов)"""
+        user = update.effective_user
+        if user is None or user.id not in self.admin_ids:
+            return
+        
+        args = context.args or []
+        if len(args) == 1:
+            mode, value = 'sample', args[0]
+        elif len(args) == 2:
+            mode, value = args
+        else:
+            await update.message.reply_text(self.profile_usage)
+            return
         
-        await update.inline_query.answer(results)
+        try:
+            answer = profiler.handle_request(mode, value)
+        except ValueError:
+            answer = self.profile_usage
+        await update.message.reply_text(answer)
     
     def setup_handlers(self, application):
         """Регистрирует все хендлеры в приложении"""
         application.add_handler(CommandHandler('start', self.start_command))
+        application.add_handler(CommandHandler('profile', self.profile_command))
         application.add_handler(InlineQueryHandler(self.inline_query))
         application.add_handler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message)
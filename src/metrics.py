@@ -0,0 +1,261 @@
+import threading
+import time
+from functools import wraps
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Границы бакетов гистограмм задержки (сек)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Базовый класс метрики с набором меток"""
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        try:
+            return tuple(labels[name] for name in self.labelnames)
+        except KeyError as e:
+            raise ValueError(f'Метрика {self.name}: не указана метка {e}') from None
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик"""
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self, items):
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram(Metric):
+    """Гистограмма задержек с фиксированными бакетами"""
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [счётчики по бакетам + переполнение, сумма, количество]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Измеряет время выполнения блока"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _render_samples(self, items):
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, (('le', _format_value(bound)),))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+class Gauge(Metric):
+    """Текущее значение; может вычисляться функцией при экспорте"""
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function, **labels):
+        self.set(function, **labels)
+
+    def clear(self):
+        # Значения-функции привязаны к объектам процесса и сохраняются
+        with self._lock:
+            self._values = {key: value for key, value in self._values.items() if callable(value)}
+
+    def value(self, **labels):
+        value = self._values.get(self._key(labels), 0)
+        return value() if callable(value) else value
+
+    def _render_samples(self, items):
+        for key, value in items:
+            value = value() if callable(value) else value
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Registry:
+    """Набор метрик процесса"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f'Метрика {name} уже зарегистрирована с другим типом')
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def clear(self):
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+PARSE_SECONDS = REGISTRY.histogram(
+    'multilink_parse_seconds', 'Time to parse a source link', ('service',))
+FIND_SECONDS = REGISTRY.histogram(
+    'multilink_find_seconds', 'Time to find a track on a target service', ('service',))
+TELEGRAM_SECONDS = REGISTRY.histogram(
+    'multilink_telegram_seconds', 'Telegram Bot API call latency', ('method',))
+UPDATE_SECONDS = REGISTRY.histogram(
+    'multilink_update_seconds', 'Whole update processing time', ('handler',))
+CACHE_REQUESTS = REGISTRY.counter(
+    'multilink_cache_requests_total', 'Cache lookups by result', ('cache', 'result'))
+CACHE_NORMALIZED = REGISTRY.counter(
+    'multilink_cache_normalized_requests_total',
+    'Cache lookups by search-key normalization rule that changed the key', ('cache', 'rule', 'result'))
+CACHE_ENTRIES = REGISTRY.gauge(
+    'multilink_cache_entries', 'Entries held in a cache', ('cache',))
+CACHE_BYTES = REGISTRY.gauge(
+    'multilink_cache_bytes', 'Estimated memory held by cache entries', ('cache',))
+CACHE_REFRESHES = REGISTRY.counter(
+    'multilink_cache_refreshes_total', 'Background cache refreshes and prewarms', ('cache',))
+ERRORS = REGISTRY.counter(
+    'multilink_errors_total', 'Errors by stage and service', ('stage', 'service'))
+FALLBACKS = REGISTRY.counter(
+    'multilink_fallbacks_total', 'Fallback answers (search links, unknown titles)', ('stage', 'service'))
+
+
+def record_cache(cache, hit):
+    """Учитывает попадание/промах кэша"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def record_normalization(cache, rules, hit):
+    """Учитывает поиск в кэше по каждому сработавшему правилу нормализации ключа"""
+    result = 'hit' if hit else 'miss'
+    for rule in rules or ('none',):
+        CACHE_NORMALIZED.inc(cache=cache, rule=rule, result=result)
+
+
+def timed_async(histogram, **labels):
+    """Декоратор: записывает время выполнения корутины в гистограмму"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_prometheus():
+    return REGISTRY.render()
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host='0.0.0.0'):
+    """Запускает HTTP-эндпоинт /metrics в фоновом потоке (режим polling)"""
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    return server
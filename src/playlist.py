@@ -0,0 +1,237 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from .providers import ProviderMap
+from .router import ROUTER
+from .link_finder import LinkFinder
+from .records import TrackInfo
+from . import tracing, ratelimit
+
+logger = logging.getLogger(__name__)
+
+# Ограничения на один запрос: число треков, время и одновременные поиски
+PLAYLIST_MAX_TRACKS = int(os.getenv('PLAYLIST_MAX_TRACKS', 200))
+PLAYLIST_TIME_BUDGET = float(os.getenv('PLAYLIST_TIME_BUDGET', 45))
+PLAYLIST_CONCURRENCY = int(os.getenv('PLAYLIST_CONCURRENCY', 8))
+# Плейлисты длиннее отправляются в чат файлом, а не сообщениями
+PLAYLIST_CHAT_TRACKS = int(os.getenv('PLAYLIST_CHAT_TRACKS', 20))
+
+SPOTIFY_COLLECTION_REGEX = re.compile(r'open\.spotify\.com/(?:intl-[\w-]+/)?(playlist|album)/([A-Za-z0-9]+)', re.IGNORECASE)
+YANDEX_COLLECTION_REGEX = re.compile(
+    r'music\.yandex\.ru/(?:album/(?P<album>\d+)/?(?:[?#]|$)|users/(?P<user>[^/?#]+)/playlists/(?P<kind>\d+))',
+    re.IGNORECASE,
+)
+
+
+class Page:
+    """Страница треков плейлиста; total — всего треков в плейлисте"""
+
+    __slots__ = ('total', 'tracks')
+
+    def __init__(self, total, tracks):
+        self.total = total
+        self.tracks = tracks
+
+
+class Collection(ABC):
+    """Абстрактный базовый класс для плейлистов и альбомов"""
+
+    def __init__(self, service_info):
+        self.service = service_info
+
+    @abstractmethod
+    def match(self, url):
+        """Проверяет, что ссылка ведёт на плейлист или альбом"""
+        pass
+
+    @abstractmethod
+    def pages(self, url):
+        """Асинхронный генератор страниц (Page) с данными треков"""
+        pass
+
+    def _track(self, url, title, artists):
+        return TrackInfo(self.service, url, title, artists)
+
+
+def _spotify_client():
+    import spotipy
+    from spotipy.oauth2 import SpotifyClientCredentials
+
+    return spotipy.Spotify(client_credentials_manager=SpotifyClientCredentials(
+        client_id=os.getenv("SPOTIFY_CLIENT_ID"),
+        client_secret=os.getenv("SPOTIFY_CLIENT_SECRET")
+    ))
+
+
+class SpotifyCollection(Collection):
+    # Максимальные размеры страниц Web API
+    PLAYLIST_PAGE_SIZE = 100
+    ALBUM_PAGE_SIZE = 50
+    PLAYLIST_FIELDS = 'total,next,items(track(name,artists(name),external_urls))'
+
+    def match(self, url):
+        return SPOTIFY_COLLECTION_REGEX.search(url) is not None
+
+    async def _call(self, upstream, function, *args, **kwargs):
+        async with ratelimit.limiter('Spotify'):
+            with tracing.span('sdk', upstream=upstream):
+                return await asyncio.to_thread(function, *args, **kwargs)
+
+    async def pages(self, url):
+        kind, collection_id = SPOTIFY_COLLECTION_REGEX.search(url).groups()
+        sp = _spotify_client()
+        offset = 0
+        while True:
+            if kind.lower() == 'playlist':
+                result = await self._call(
+                    'spotify.playlist_items', sp.playlist_items, collection_id, fields=self.PLAYLIST_FIELDS,
+                    limit=self.PLAYLIST_PAGE_SIZE, offset=offset, additional_types=('track',),
+                )
+                # Удалённые и локальные треки приходят без track или без ссылки
+                items = [item['track'] for item in result['items'] if item.get('track')]
+            else:
+                result = await self._call('spotify.album_tracks', sp.album_tracks, collection_id, limit=self.ALBUM_PAGE_SIZE, offset=offset)
+                items = result['items']
+
+            yield Page(result['total'], [
+                self._track(
+                    item['external_urls'].get('spotify'),
+                    item['name'],
+                    ', '.join(artist['name'] for artist in item['artists']),
+                )
+                for item in items if item.get('external_urls')
+            ])
+            offset += len(result['items'])
+            if not result.get('next') or not result['items']:
+                return
+
+
+def _yandex_client(client_class):
+    return client_class(os.getenv("YANDEX_MUSIC_TOKEN")).init()
+
+
+class YandexCollection(Collection):
+    # Треки плейлиста запрашиваются пачками по их id
+    PAGE_SIZE = 100
+
+    def match(self, url):
+        return YANDEX_COLLECTION_REGEX.search(url) is not None
+
+    async def _call(self, upstream, function, *args):
+        async with ratelimit.limiter('YandexMusic'):
+            with tracing.span('sdk', upstream=upstream):
+                # SDK блокирующий: выполняем в потоке, чтобы не останавливать event loop
+                return await asyncio.to_thread(function, *args)
+
+    def _yandex_track(self, track):
+        album_id = track.albums[0].id if track.albums else None
+        url = f'https://music.yandex.ru/album/{album_id}/track/{track.id}' if album_id else None
+        return self._track(url, track.title, ', '.join(artist.name for artist in track.artists))
+
+    async def pages(self, url):
+        from yandex_music import Client
+
+        match = YANDEX_COLLECTION_REGEX.search(url)
+        client = await self._call('yandex_music.init', _yandex_client, Client)
+
+        if match.group('album'):
+            # Альбом приходит целиком за один запрос, отдаём его страницами
+            album = await self._call('yandex_music.albums_with_tracks', client.albums_with_tracks, match.group('album'))
+            tracks = [track for volume in album.volumes or () for track in volume]
+            for start in range(0, len(tracks), self.PAGE_SIZE):
+                yield Page(len(tracks), [self._yandex_track(track) for track in tracks[start:start + self.PAGE_SIZE]])
+            return
+
+        playlist = await self._call(
+            'yandex_music.users_playlists', client.users_playlists, int(match.group('kind')), match.group('user'),
+        )
+        track_ids = [short.track_id for short in playlist.tracks or ()]
+        for start in range(0, len(track_ids), self.PAGE_SIZE):
+            tracks = await self._call('yandex_music.tracks', client.tracks, track_ids[start:start + self.PAGE_SIZE])
+            yield Page(len(track_ids), [self._yandex_track(track) for track in tracks if track.available is not False])
+
+
+class CollectionJob:
+    """Разрешение плейлиста с ограничениями по числу треков и времени.
+
+    Страницы запрашиваются по одной, треки страницы ищутся параллельно (не
+    больше concurrency одновременно) и отдаются по порядку, поэтому в памяти
+    держится только текущая страница.
+    """
+
+    def __init__(self, collection, url, finder=None, max_tracks=None, time_budget=None, concurrency=None):
+        self.collection = collection
+        self.url = url
+        self.finder = finder or LinkFinder()
+        self.max_tracks = PLAYLIST_MAX_TRACKS if max_tracks is None else max_tracks
+        self.time_budget = PLAYLIST_TIME_BUDGET if time_budget is None else time_budget
+        self.concurrency = concurrency or PLAYLIST_CONCURRENCY
+        self.total = None
+        self.resolved = 0
+        # Причина, по которой обработаны не все треки: 'limit' или 'time'
+        self.truncated = None
+
+    async def results(self):
+        """Асинхронный генератор пар (данные трека, найденные ссылки)"""
+        deadline = time.monotonic() + self.time_budget
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def resolve(track):
+            async with semaphore:
+                return await self.finder.find_link(track)
+
+        pages = self.collection.pages(self.url).__aiter__()
+        try:
+            while self.resolved < self.max_tracks:
+                try:
+                    page = await asyncio.wait_for(pages.__anext__(), deadline - time.monotonic())
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    self.truncated = 'time'
+                    return
+                if self.total is None:
+                    self.total = page.total
+
+                tracks = page.tracks[:self.max_tracks - self.resolved]
+                tasks = [asyncio.create_task(resolve(track)) for track in tracks]
+                if tasks:
+                    _, pending = await asyncio.wait(tasks, timeout=max(deadline - time.monotonic(), 0))
+                    for task in pending:
+                        task.cancel()
+                    # Дожидаемся отмены, иначе состояние задач ещё не определено
+                    await asyncio.gather(*pending, return_exceptions=True)
+                for track, task in zip(tracks, tasks):
+                    if task.cancelled():
+                        self.truncated = 'time'
+                        return
+                    self.resolved += 1
+                    links = task.result() if task.exception() is None else {'error': str(task.exception())}
+                    yield track, links
+            if self.total is not None and self.total > self.resolved:
+                self.truncated = 'limit'
+        finally:
+            await pages.aclose()
+
+
+class CollectionResolver:
+    def __init__(self, services=None):
+        self.collections = ProviderMap('collection', services)
+
+    def match(self, url):
+        """Возвращает провайдера плейлистов для ссылки или None"""
+        name = ROUTER.route(url)
+        if name not in self.collections:
+            return None
+        collection = self.collections[name]
+        return collection if collection.match(url) else None
+
+    def start(self, url, **limits):
+        """Создаёт задание на разрешение плейлиста (None, если ссылка не на плейлист)"""
+        collection = self.match(url)
+        if collection is None:
+            return None
+        return CollectionJob(collection, url, **limits)
@@ -0,0 +1,116 @@
+import os
+import time
+import asyncio
+import logging
+from .cache import POPULARITY, canonical_url
+from .link_parser import LinkParser
+from .link_finder import LinkFinder
+from .logger import log_event
+from . import ratelimit
+
+logger = logging.getLogger(__name__)
+
+# Период обслуживания кэша и окно обновления до истечения TTL (секунды)
+PREWARM_INTERVAL = float(os.getenv('PREWARM_INTERVAL', 60))
+REFRESH_AHEAD = float(os.getenv('REFRESH_AHEAD', 600))
+# Сколько самых популярных ссылок поддерживать в кэше и с какой частоты
+REFRESH_TOP = int(os.getenv('REFRESH_TOP', 100))
+REFRESH_MIN_HITS = float(os.getenv('REFRESH_MIN_HITS', 2))
+# Период полураспада счётчиков популярности (секунды)
+POPULARITY_HALF_LIFE = float(os.getenv('POPULARITY_HALF_LIFE', 6 * 3600))
+# Файл со ссылками (по одной на строку) для прогрева при запуске
+PREWARM_FILE = os.getenv('PREWARM_FILE')
+# Сколько ждать свободного слота upstream, прежде чем всё же занять очередь
+CAPACITY_WAIT = 5.0
+
+
+def read_prewarm_file(path):
+    """Ссылки для прогрева: непустые строки, не начинающиеся с #"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+class CacheMaintainer:
+    """Фоновое обслуживание кэшей разбора и поиска.
+
+    Популярные ссылки обновляются заранее, до истечения TTL, чтобы их
+    запрашивающие не ждали upstream. Обновления идут по одной ссылке и только
+    при свободной ёмкости upstream, поэтому не отнимают лимиты у пользователей.
+    """
+
+    def __init__(self, parser=None, finder=None, popularity=POPULARITY, interval=PREWARM_INTERVAL,
+                 refresh_ahead=REFRESH_AHEAD, top=REFRESH_TOP, min_hits=REFRESH_MIN_HITS,
+                 half_life=POPULARITY_HALF_LIFE):
+        self.parser = parser or LinkParser(popularity=popularity)
+        self.finder = finder or LinkFinder()
+        self.popularity = popularity
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.top = top
+        self.min_hits = min_hits
+        self.half_life = half_life
+
+    async def _wait_for_capacity(self, names):
+        """Ждёт, пока у всех upstream появится свободный слот (не дольше CAPACITY_WAIT)"""
+        deadline = time.monotonic() + CAPACITY_WAIT
+        while time.monotonic() < deadline:
+            if all(ratelimit.limiter(name).has_capacity() for name in names):
+                return
+            await asyncio.sleep(0.05)
+
+    async def _refresh_url(self, key, url, expiring_before):
+        """Обновляет разбор и поиск ссылки, если записи скоро истекут; возвращает число обновлений"""
+        await self._wait_for_capacity(self.parser.services)
+        refreshed = 0
+        expires_at = self.parser.cache.expires_at(key)
+        if expires_at is None or expires_at <= expiring_before:
+            data = await self.parser.refresh(url)
+            refreshed += 1
+        else:
+            data = self.parser.cache.peek(key)
+        if data and 'error' not in data:
+            refreshed += await self.finder.refresh(data, expiring_before)
+        return refreshed
+
+    async def refresh_once(self):
+        """Один проход: обновляет популярные записи, истекающие в ближайшие refresh_ahead секунд"""
+        expiring_before = time.monotonic() + self.refresh_ahead
+        refreshed = 0
+        for key, url in self.popularity.top(self.top, self.min_hits):
+            try:
+                refreshed += await self._refresh_url(key, url, expiring_before)
+            except Exception as e:
+                logger.warning('Error refreshing %s: %s', url, e)
+        return refreshed
+
+    async def prewarm(self, urls):
+        """Заполняет кэш для списка ссылок и отмечает их популярными"""
+        refreshed = 0
+        for url in urls:
+            key = canonical_url(url)
+            # Прогретые ссылки сразу попадают в список обновляемых
+            self.popularity.record(key, url, weight=self.min_hits)
+            try:
+                refreshed += await self._refresh_url(key, url, time.monotonic() + self.refresh_ahead)
+            except Exception as e:
+                logger.warning('Error prewarming %s: %s', url, e)
+        return refreshed
+
+    async def run(self, prewarm_urls=()):
+        """Прогрев и бесконечный цикл обслуживания (для режима polling)"""
+        if prewarm_urls:
+            refreshed = await self.prewarm(prewarm_urls)
+            log_event(logger, 'cache_prewarm', urls=len(prewarm_urls), refreshed=refreshed)
+        decay = 0.5 ** (self.interval / self.half_life) if self.half_life > 0 else 1.0
+        while True:
+            await asyncio.sleep(self.interval)
+            self.popularity.decay(decay)
+            refreshed = await self.refresh_once()
+            if refreshed:
+                log_event(logger, 'cache_refresh', refreshed=refreshed, tracked=len(self.popularity))
+
+
+def start(prewarm_file=PREWARM_FILE):
+    """Запускает обслуживание кэша в текущем event loop, возвращает задачу"""
+    urls = read_prewarm_file(prewarm_file) if prewarm_file else ()
+    return asyncio.get_running_loop().create_task(CacheMaintainer().run(urls))
@@ -0,0 +1,183 @@
+import collections
+import cProfile
+import os
+import sys
+import tempfile
+import threading
+import time
+from functools import wraps
+
+# Каталог для результатов профилирования
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'multilink-profiles'))
+# Интервал между сэмплами стеков (сек)
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+# Ограничения, чтобы случайная команда не оставила профилировщик надолго
+PROFILE_MAX_SECONDS = 300
+PROFILE_MAX_UPDATES = 1000
+
+
+def _output_path(prefix, extension):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f'{prefix}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.{extension}')
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик: периодически снимает стеки всех потоков.
+
+    Работает в отдельном потоке и не инструментирует вызовы, поэтому его
+    можно включать на живом трафике. Результат — collapsed stacks
+    (формат flamegraph.pl / speedscope).
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples = collections.Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def sample(self):
+        """Снимает по одному стеку с каждого потока, кроме собственного"""
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def _run(self, seconds, path):
+        deadline = time.monotonic() + seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            self.sample()
+            self._stop.wait(self.interval)
+        self.write(path)
+
+    def start(self, seconds, path=None):
+        """Запускает сэмплирование на seconds секунд, возвращает путь к результату"""
+        path = path or _output_path('sampling', 'collapsed')
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(min(seconds, PROFILE_MAX_SECONDS), path),
+            name='sampling-profiler',
+            daemon=True,
+        )
+        self._thread.start()
+        return path
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class UpdateProfiler:
+    """Детерминированный профиль (cProfile) следующих K update'ов.
+
+    Обработка update'ов в event loop пересекается, поэтому профилировщик
+    включён, пока обрабатывается хотя бы один из отслеживаемых update'ов.
+    Слот занимается при входе update'а, так что одновременно начатых
+    update'ов в профиль попадает не больше K.
+    """
+
+    def __init__(self):
+        self.remaining = 0
+        self.path = None
+        self._profile = None
+        self._active = 0
+
+    def request(self, updates, path=None):
+        """Включает профилирование следующих updates update'ов; None, если
+        предыдущий профиль ещё не записан (его данные были бы потеряны)"""
+        if self._profile is not None:
+            return None
+        self.remaining = min(updates, PROFILE_MAX_UPDATES)
+        self.path = path or _output_path('updates', 'pstats')
+        self._profile = cProfile.Profile()
+        return self.path
+
+    def _enter(self):
+        self.remaining -= 1
+        if self._active == 0:
+            self._profile.enable()
+        self._active += 1
+
+    def _exit(self):
+        self._active -= 1
+        if self._active == 0:
+            self._profile.disable()
+            if self.remaining <= 0:
+                self._profile.dump_stats(self.path)
+                self._profile = None
+
+    def wrap(self, func):
+        """Декоратор хендлера update'ов"""
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if self.remaining <= 0 or self._profile is None:
+                return await func(*args, **kwargs)
+            self._enter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self._exit()
+        return wrapper
+
+
+_lock = threading.Lock()
+_sampler = None
+UPDATE_PROFILER = UpdateProfiler()
+
+
+def start_sampling(seconds, interval=PROFILE_INTERVAL):
+    """Запускает сэмплирующий профилировщик; None, если он уже работает"""
+    global _sampler
+    with _lock:
+        if _sampler is not None and _sampler.running:
+            return None
+        _sampler = SamplingProfiler(interval)
+        return _sampler.start(seconds)
+
+
+def profile_next_updates(updates):
+    """Включает cProfile для следующих updates update'ов; None, если он уже работает"""
+    return UPDATE_PROFILER.request(updates)
+
+
+def profile_update(func):
+    return UPDATE_PROFILER.wrap(func)
+
+
+def handle_request(mode, value):
+    """Общая точка входа для команды бота и GET-параметра webhook"""
+    value = int(value)
+    if value <= 0:
+        raise ValueError('Значение должно быть положительным')
+    if mode == 'sample':
+        path = start_sampling(value)
+        if path is None:
+            return 'Sampling profiler is already running'
+        return f'Sampling for {min(value, PROFILE_MAX_SECONDS)}s, output: {path}'
+    if mode == 'updates':
+        path = profile_next_updates(value)
+        if path is None:
+            return 'Update profiling is already running'
+        return f'Profiling next {min(value, PROFILE_MAX_UPDATES)} updates, output: {path}'
+    raise ValueError(f'Неизвестный режим профилирования: {mode}')
@@ -0,0 +1,112 @@
+import importlib
+import logging
+import threading
+import time
+from collections.abc import Mapping
+from .constants import SERVICES
+from .router import ROUTER
+
+logger = logging.getLogger(__name__)
+
+# Реестр провайдеров: где лежат реализации парсера/поиска и какие
+# тяжёлые зависимости им нужны. Модули импортируются только при первом
+# обращении к провайдеру (или фоновой предзагрузкой), а не при импорте бота.
+# Ключ 'collection' (плейлисты и альбомы) необязателен.
+PROVIDERS = {
+    'Spotify': {
+        'parser': ('src.link_parser', 'SpotifyParser'),
+        'finder': ('src.link_finder', 'SpotifyFinder'),
+        'collection': ('src.playlist', 'SpotifyCollection'),
+        'deps': ('aiohttp', 'bs4', 'spotipy'),
+    },
+    'YandexMusic': {
+        'parser': ('src.link_parser', 'YandexParser'),
+        'finder': ('src.link_finder', 'YandexFinder'),
+        'collection': ('src.playlist', 'YandexCollection'),
+        'deps': ('yandex_music',),
+    },
+    'MTS': {
+        'parser': ('src.link_parser', 'MTSParser'),
+        'finder': ('src.link_finder', 'MTSFinder'),
+        'deps': ('aiohttp', 'bs4', 'vk_api'),
+    },
+}
+
+_preload_lock = threading.Lock()
+_preload_thread = None
+
+
+def register_provider(name, parser, finder, deps=(), service_info=None, collection=None):
+    """Регистрирует нового провайдера (parser/finder/collection — пары (модуль, класс))"""
+    PROVIDERS[name] = {'parser': parser, 'finder': finder, 'deps': tuple(deps)}
+    if collection is not None:
+        PROVIDERS[name]['collection'] = collection
+    if service_info is not None:
+        SERVICES[name] = service_info
+        ROUTER.register(name, service_info.get('hosts', ()))
+
+
+def load_class(name, kind):
+    """Импортирует модуль провайдера и возвращает класс парсера или поиска"""
+    module_name, class_name = PROVIDERS[name][kind]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+def import_dependencies(names=None):
+    """Импортирует зависимости провайдеров, возвращает время импорта по модулям"""
+    timings = {}
+    for name in names or PROVIDERS:
+        for dep in PROVIDERS[name]['deps']:
+            if dep in timings:
+                continue
+            start = time.perf_counter()
+            try:
+                importlib.import_module(dep)
+            except ImportError as e:
+                logger.debug('Зависимость %s недоступна: %s', dep, e)
+                continue
+            timings[dep] = time.perf_counter() - start
+    return timings
+
+
+def preload(names=None):
+    """Запускает фоновую предзагрузку зависимостей провайдеров (один раз)"""
+    global _preload_thread
+    with _preload_lock:
+        if _preload_thread is None:
+            _preload_thread = threading.Thread(
+                target=import_dependencies,
+                args=(names,),
+                name='provider-preload',
+                daemon=True,
+            )
+            _preload_thread.start()
+        return _preload_thread
+
+
+class ProviderMap(Mapping):
+    """Ленивый словарь провайдеров: экземпляр создаётся при первом обращении"""
+
+    def __init__(self, kind, services=None):
+        self.kind = kind
+        self.services = services if services is not None else SERVICES
+        self._instances = {}
+
+    def __getitem__(self, name):
+        instance = self._instances.get(name)
+        if instance is None:
+            if name not in self:
+                raise KeyError(name)
+            instance = load_class(name, self.kind)(self.services[name])
+            self._instances[name] = instance
+        return instance
+
+    def __iter__(self):
+        return (name for name, provider in PROVIDERS.items() if self.kind in provider)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, name):
+        return self.kind in PROVIDERS.get(name, ())
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import time
+import weakref
+
+# Ограничения по умолчанию: одновременных запросов и запросов в секунду
+DEFAULT_LIMITS = {
+    'Spotify': (4, 10.0),
+    'YandexMusic': (2, 5.0),
+    'MTS': (2, 5.0),
+}
+
+
+def parse_limits(spec):
+    """Разбирает строку вида 'Spotify=4:10,MTS=2:5' (одновременно:в секунду)"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        concurrency, _, rate = value.partition(':')
+        limits[name.strip()] = (int(concurrency), float(rate) if rate else 0.0)
+    return limits
+
+
+class UpstreamLimiter:
+    """Ограничивает число одновременных запросов и их частоту к одному upstream.
+
+    Семафор создаётся отдельно для каждого event loop: webhook запускает
+    новый loop на каждый запрос.
+    """
+
+    def __init__(self, concurrency, rate=0.0):
+        self.concurrency = concurrency
+        self.rate = rate
+        self._next_slot = 0.0
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    async def _wait_for_slot(self):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def has_capacity(self):
+        """Есть ли свободный слот прямо сейчас (запрос не будет ждать)"""
+        semaphore = self._semaphores.get(asyncio.get_running_loop())
+        if semaphore is not None and semaphore.locked():
+            return False
+        return self.rate <= 0 or self._next_slot <= time.monotonic()
+
+    async def __aenter__(self):
+        await self._semaphore().acquire()
+        try:
+            await self._wait_for_slot()
+        except BaseException:
+            self._semaphore().release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._semaphore().release()
+
+
+_limiters = {}
+
+
+def configure(limits):
+    """Задаёт ограничения для upstream (заменяет существующие)"""
+    for name, (concurrency, rate) in limits.items():
+        _limiters[name] = UpstreamLimiter(concurrency, rate)
+
+
+def limiter(name):
+    """Ограничитель для upstream name (без ограничений, если он не настроен)"""
+    upstream_limiter = _limiters.get(name)
+    if upstream_limiter is None:
+        upstream_limiter = _limiters[name] = UpstreamLimiter(1000)
+    return upstream_limiter
+
+
+configure(DEFAULT_LIMITS)
+configure(parse_limits(os.getenv('UPSTREAM_LIMITS', '')))
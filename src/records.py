@@ -0,0 +1,184 @@
+"""Компактные записи результатов разбора и поиска.
+
+Вместо словарей с вложенной копией SERVICES записи хранят только
+интернированный идентификатор сервиса ('Spotify', 'YandexMusic', 'MTS').
+Для совместимости поддерживается доступ по ключу, как к прежним словарям
+(record['title'], record.get('url'), record['original_service']['name']).
+"""
+import json
+import sys
+from .constants import SERVICES
+
+# Версия формата сериализации записей кэша
+FORMAT_VERSION = 1
+
+
+def service_id(service):
+    """Интернированный идентификатор сервиса по записи SERVICES, имени или отображаемому имени"""
+    if isinstance(service, dict):
+        service = service.get('name')
+    if service in SERVICES:
+        return sys.intern(service)
+    for name, info in SERVICES.items():
+        if info['name'] == service:
+            return sys.intern(name)
+    raise KeyError(service)
+
+
+class Record:
+    """Базовый класс записей со слотами и доступом по ключу"""
+
+    __slots__ = ()
+    tag = None
+
+    def __getitem__(self, key):
+        if key not in self._keys():
+            raise KeyError(key)
+        return self.get(key)
+
+    def get(self, key, default=None):
+        if key not in self._keys():
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return key in self._keys() and getattr(self, key) is not None
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.to_tuple() == other.to_tuple()
+
+    def __hash__(self):
+        return hash(self.to_tuple())
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+    def _keys(self):
+        return self.__slots__
+
+    def to_dict(self):
+        return {name: self.get(name) for name in self._keys() if name in self}
+
+    def to_tuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def nbytes(self):
+        """Примерный размер записи в памяти (интернированные строки не учитываются)"""
+        size = sys.getsizeof(self)
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is not None and name != 'service' and not isinstance(value, bool):
+                size += sys.getsizeof(value)
+        return size
+
+
+class TrackInfo(Record):
+    """Данные трека, полученные парсером исходной ссылки"""
+
+    __slots__ = ('service', 'url', 'title', 'artists')
+    tag = 't'
+
+    def __init__(self, service, url, title, artists):
+        self.service = service_id(service)
+        self.url = url
+        self.title = title
+        self.artists = artists
+
+    @property
+    def original_service(self):
+        return SERVICES[self.service]
+
+    def _keys(self):
+        return ('url', 'original_service', 'title', 'artists')
+
+    def __contains__(self, key):
+        return key == 'original_service' or super().__contains__(key)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['original_service'], data.get('url'), data.get('title'), data.get('artists'))
+
+
+class LinkResult(Record):
+    """Результат поиска трека на одном сервисе"""
+
+    __slots__ = ('service', 'url', 'fallback', 'error')
+    tag = 'l'
+
+    def __init__(self, service, url=None, fallback=False, error=None):
+        self.service = service_id(service)
+        self.url = url
+        self.fallback = bool(fallback)
+        self.error = error
+
+    @property
+    def service_name(self):
+        """Отображаемое имя сервиса"""
+        return SERVICES[self.service]['name']
+
+    def get(self, key, default=None):
+        # Прежние словари хранили в 'service' отображаемое имя
+        if key == 'service':
+            return self.service_name
+        if key == 'fallback':
+            return self.fallback or default
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        if key == 'fallback':
+            return self.fallback
+        return super().__contains__(key)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['service'], data.get('url'), data.get('fallback', False), data.get('error'))
+
+
+_RECORD_TYPES = {cls.tag: cls for cls in (TrackInfo, LinkResult)}
+
+
+def encode(record):
+    """Стабильное представление записи для JSON: [версия, тип, поля...]"""
+    return [FORMAT_VERSION, record.tag, *record.to_tuple()]
+
+
+def decode(data):
+    version, tag, *fields = data
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Неподдерживаемая версия формата записи: {version}')
+    return _RECORD_TYPES[tag](*fields)
+
+
+def dumps(record):
+    return json.dumps(encode(record), ensure_ascii=False, separators=(',', ':'))
+
+
+def loads(text):
+    return decode(json.loads(text))
+
+
+def track_info(result):
+    """Результат парсера в виде TrackInfo (ошибки и None возвращаются как есть)"""
+    if isinstance(result, dict) and 'error' not in result and 'original_service' in result:
+        return TrackInfo.from_dict(result)
+    return result
+
+
+def link_result(result):
+    """Результат поиска в виде LinkResult"""
+    if isinstance(result, dict):
+        return LinkResult.from_dict(result)
+    return result
+
+
+def nbytes(value):
+    """Примерный размер значения кэша в памяти"""
+    if isinstance(value, Record):
+        return value.nbytes()
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + nbytes(v) for k, v in value.items())
+    return sys.getsizeof(value)
@@ -0,0 +1,64 @@
+import re
+from .constants import SERVICES
+
+# Один проход по тексту: схема, хост и остаток ссылки до пробела
+_URL_REGEX = re.compile(r'https?://([^\s/?#:@]+)(?::\d+)?([^\s]*)', re.IGNORECASE)
+# Знаки препинания, которыми в чате обычно заканчивается предложение после ссылки
+_TRAILING = '.,!?;:)]}>"\'»'
+
+
+def normalize_host(host):
+    host = host.lower().rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+class LinkRouter:
+    """Маршрутизация ссылок по хосту.
+
+    Таблица «хост → сервис» строится заранее, поэтому ссылки на посторонние
+    сайты отбрасываются одним поиском в словаре, без регулярных выражений
+    сервисов, а стоимость не растёт с числом сервисов.
+    """
+
+    def __init__(self):
+        self.hosts = {}
+
+    @classmethod
+    def from_services(cls, services):
+        router = cls()
+        for name, service in services.items():
+            router.register(name, service.get('hosts', ()))
+        return router
+
+    def register(self, name, hosts):
+        """Направляет ссылки на хосты hosts в сервис name"""
+        for host in hosts:
+            self.hosts[normalize_host(host)] = name
+
+    def extract(self, text):
+        """Все ссылки в тексте по порядку: пары (сервис или None, ссылка)"""
+        if '://' not in text:
+            return
+        for match in _URL_REGEX.finditer(text):
+            url = match.group(0).rstrip(_TRAILING)
+            name = self.hosts.get(normalize_host(match.group(1)))
+            # Ссылка сервиса должна вести на страницу, а не на корень сайта
+            if name is not None and len(url) - (match.end(1) - match.start()) <= 1:
+                name = None
+            yield name, url
+
+    def first_supported(self, text):
+        """Первая ссылка на поддерживаемый сервис: (сервис, ссылка) или None"""
+        for name, url in self.extract(text):
+            if name is not None:
+                return name, url
+        return None
+
+    def route(self, url):
+        """Сервис, к которому относится отдельная ссылка, или None"""
+        for name, _ in self.extract(url.strip()):
+            return name
+        return None
+
+
+ROUTER = LinkRouter.from_services(SERVICES)
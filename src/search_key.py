@@ -0,0 +1,126 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Правила нормализации (порядок применения); по ним разбиваются метрики кэша
+RULES = ('residue', 'placeholder', 'featuring', 'version', 'artist_order', 'diacritics', 'case')
+
+# Хвост заголовков страниц МТС Музыки
+_RESIDUE_REGEX = re.compile(r'\s*(?:[-–—|]\s*)?(?:слушать(?: песню)? онлайн.*|мтс музыка)$', re.IGNORECASE)
+# Заглушки парсеров вместо неизвестного исполнителя
+_PLACEHOLDERS = {'unknown artist', 'unknown title', 'n/a'}
+_FEAT = r'\b(?:feat\.?|ft\.?|featuring|при участии)\s+'
+# "Song (feat. X)", "Song [ft. X]", "Song feat. X"
+_TITLE_FEAT_REGEX = re.compile(r'\s*(?:[(\[]\s*' + _FEAT + r'([^()\[\]]+?)\s*[)\]]|' + _FEAT + r'(.+)$)', re.IGNORECASE)
+_ARTIST_FEAT_REGEX = re.compile(r'\s+' + _FEAT, re.IGNORECASE)
+# "(Remastered 2011)", "[2011 Remaster]", "- Remastered 2011", "(Deluxe Edition)"
+_VERSION_WORDS = r'\b(?:remaster(?:ed)?|deluxe(?: edition| version)?|anniversary(?: edition)?|bonus track)\b'
+_VERSION_REGEX = re.compile(
+    r'\s*(?:[(\[][^()\[\]]*' + _VERSION_WORDS + r'[^()\[\]]*[)\]]|\s[-–—]\s[^-–—]*' + _VERSION_WORDS + r'[^-–—]*$)',
+    re.IGNORECASE,
+)
+_ARTIST_SPLIT_REGEX = re.compile(r'\s*(?:,|&|;)\s*')
+_SPACES_REGEX = re.compile(r'\s+')
+_QUOTES = str.maketrans({'’': "'", '‘': "'", '`': "'", '“': '"', '”': '"', '«': '"', '»': '"', '–': '-', '—': '-'})
+
+
+class SearchKey:
+    """Нормализованные исполнители и название трека.
+
+    artists (отдельные имена) и title — очищенные значения с сохранёнными
+    регистром и диакритикой, query — строка поиска для upstream (исполнители
+    в исходной записи, без разбиения), key — ключ кэша, rules — сработавшие
+    правила.
+    """
+
+    __slots__ = ('artists', 'title', 'query', 'key', 'rules')
+
+    def __init__(self, artists, title, query, key, rules):
+        self.artists = artists
+        self.title = title
+        self.query = query
+        self.key = key
+        self.rules = rules
+
+    def __repr__(self):
+        return f'SearchKey({self.key!r}, rules={self.rules!r})'
+
+
+def _clean(text):
+    return _SPACES_REGEX.sub(' ', text.translate(_QUOTES)).strip()
+
+
+def _strip_diacritics(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return unicodedata.normalize('NFC', ''.join(c for c in decomposed if not unicodedata.combining(c)))
+
+
+@lru_cache(maxsize=4096)
+def canonicalize(artists, title):
+    """Возвращает SearchKey для пары (исполнители, название)"""
+    rules = []
+    artists = _clean(artists or '')
+    title = _clean(title or '')
+
+    stripped = _RESIDUE_REGEX.sub('', title)
+    if stripped != title:
+        rules.append('residue')
+        title = stripped
+
+    if artists.casefold() in _PLACEHOLDERS:
+        rules.append('placeholder')
+        artists = ''
+    if title.casefold() in _PLACEHOLDERS:
+        rules.append('placeholder')
+        title = ''
+
+    # Исполнители для поиска в исходной записи: "Simon & Garfunkel" не
+    # разбивается, & и запятые разбираются только для ключа
+    query_artists = artists
+
+    names = []
+    featured = []
+    match = _TITLE_FEAT_REGEX.search(title)
+    if match:
+        featured.append(match.group(1) or match.group(2))
+        title = (title[:match.start()] + title[match.end():]).strip()
+    parts = _ARTIST_FEAT_REGEX.split(artists, maxsplit=1)
+    if len(parts) > 1:
+        artists, guest = parts
+        featured.insert(0, guest)
+    if featured:
+        rules.append('featuring')
+
+    stripped = _VERSION_REGEX.sub('', title).strip()
+    if stripped != title:
+        rules.append('version')
+        title = stripped
+
+    seen = set()
+    for name in _ARTIST_SPLIT_REGEX.split(', '.join([artists, *featured])):
+        folded = name.casefold()
+        if name and folded not in seen:
+            seen.add(folded)
+            names.append(name)
+
+    # Ключ: без диакритики, без регистра, исполнители по алфавиту
+    plain = [_strip_diacritics(name) for name in names]
+    plain_title = _strip_diacritics(title)
+    if plain != names or plain_title != title:
+        rules.append('diacritics')
+    folded = [name.casefold() for name in plain]
+    folded_title = plain_title.casefold()
+    if folded != plain or folded_title != plain_title:
+        rules.append('case')
+    ordered = sorted(folded)
+    if ordered != folded:
+        rules.append('artist_order')
+
+    key = f"{' & '.join(ordered)}|{folded_title}"
+    query = f'{query_artists} - {title}' if query_artists else title
+    return SearchKey(tuple(names), title, query, key, tuple(sorted(set(rules), key=RULES.index)))
+
+
+def search_key(track_info):
+    """SearchKey для данных трека от парсера"""
+    return canonicalize(track_info.get('artists') or '', track_info.get('title') or '')
@@ -0,0 +1,241 @@
+import atexit
+import collections
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+# Доля трасс, которые экспортируются всегда
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.0))
+# Медленные обновления экспортируются независимо от сэмплирования
+TRACE_SLOW_SECONDS = float(os.getenv('TRACE_SLOW_SECONDS', 2.0))
+# Файл JSONL для экспорта (по умолчанию только кольцевой буфер в памяти)
+TRACE_FILE = os.getenv('TRACE_FILE')
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', 100))
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """Участок трассы: имя, время начала/конца, атрибуты и ошибка"""
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, trace, name, parent_id, attributes):
+        self.trace = trace
+        self.name = name
+        self.span_id = len(trace.spans)
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+        trace.spans.append(self)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def record_error(self, error):
+        self.error = str(error) if not isinstance(error, str) else error
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self):
+        return {
+            'id': self.span_id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'start_ms': round((self.start - self.trace.start) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class Trace:
+    """Трасса обработки одного update"""
+    __slots__ = ('trace_id', 'start', 'wall_time', 'spans')
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.start = time.perf_counter()
+        self.wall_time = time.time()
+        self.spans = []
+
+    @property
+    def root(self):
+        return self.spans[0]
+
+    @property
+    def has_error(self):
+        return any(span.error for span in self.spans)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'timestamp': self.wall_time,
+            'duration_ms': round(self.root.duration * 1000, 3),
+            'spans': [span.to_dict() for span in self.spans],
+        }
+
+
+class RingBufferExporter:
+    """Хранит последние N трасс в памяти"""
+
+    def __init__(self, size=TRACE_BUFFER_SIZE):
+        self._traces = collections.deque(maxlen=size)
+
+    def export(self, trace):
+        self._traces.append(trace.to_dict())
+
+    def traces(self):
+        return list(self._traces)
+
+
+class JsonlExporter:
+    """Дописывает трассы в файл JSONL.
+
+    В event loop трасса только ставится в очередь: сериализация и запись на
+    диск идут в фоновом потоке, как у логов (QueueListener).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='trace-export', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def export(self, trace):
+        if self._thread is None:
+            self._start()
+        self._queue.put(trace.to_dict())
+
+    def flush(self):
+        """Ждёт, пока все поставленные в очередь трассы будут записаны"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            # Накопившиеся трассы записываются одним открытием файла
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    for data in batch:
+                        f.write(json.dumps(data, ensure_ascii=False, default=str) + '\n')
+            except Exception as e:
+                logger.warning('Error writing traces to %s: %s', self.path, e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+class Tracer:
+    """Создаёт трассы и решает, какие из них экспортировать"""
+
+    def __init__(self, sample_rate=TRACE_SAMPLE_RATE, slow_seconds=TRACE_SLOW_SECONDS, exporters=()):
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.exporters = list(exporters)
+
+    def should_export(self, trace):
+        if trace.root.duration >= self.slow_seconds or trace.has_error:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @contextmanager
+    def trace(self, name, **attributes):
+        """Начинает новую трассу с корневым участком"""
+        root = Span(Trace(), name, None, attributes)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.record_error(e)
+            raise
+        finally:
+            root.end = time.perf_counter()
+            _current_span.reset(token)
+            if self.exporters and self.should_export(root.trace):
+                for exporter in self.exporters:
+                    exporter.export(root.trace)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Участок внутри текущей трассы (вне трассы ничего не записывает)"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+
+
+def _default_exporters():
+    exporters = [RingBufferExporter()]
+    if TRACE_FILE:
+        exporters.append(JsonlExporter(TRACE_FILE))
+    return exporters
+
+
+TRACER = Tracer(exporters=_default_exporters())
+
+
+def trace(name, **attributes):
+    return TRACER.trace(name, **attributes)
+
+
+def span(name, **attributes):
+    return TRACER.span(name, **attributes)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def recent_traces():
+    """Трассы из кольцевого буфера (последние экспортированные)"""
+    for exporter in TRACER.exporters:
+        if isinstance(exporter, RingBufferExporter):
+            return exporter.traces()
+    return []
+
+
+def trace_update(handler):
+    """Декоратор хендлера: открывает трассу на время обработки update"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(self, update, *args, **kwargs):
+            with TRACER.trace('update', handler=handler, update_id=getattr(update, 'update_id', None)):
+                return await func(self, update, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,15 @@
+import pytest
+from src.cache import PARSE_CACHE, FIND_CACHE, POPULARITY
+from src.markdown import RENDERER
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Кэши разрешения ссылок общие для процесса: очищаем между тестами"""
+    PARSE_CACHE.clear()
+    FIND_CACHE.clear()
+    POPULARITY.clear()
+    RENDERER.cache.clear()
+    yield
+    PARSE_CACHE.clear()
+    FIND_CACHE.clear()
+    POPULARITY.clear()
@@ -0,0 +1,116 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from src import batch
+from src.batch import BatchConverter, Checkpoint
+from src.constants import SERVICES
+
+TRACK = {'title': 'Song', 'artists': 'Artist', 'original_service': SERVICES['Spotify']}
+LINKS = [{'service': 'YandexMusic', 'url': 'https://music.yandex.ru/track/1'}]
+
+def make_converter(workers=4):
+    parser = AsyncMock()
+    parser.parse_link.return_value = TRACK
+    finder = AsyncMock()
+    finder.find_link.return_value = LINKS
+    return BatchConverter(workers=workers, parser=parser, finder=finder)
+
+class TestBatchConverter:
+    @pytest.mark.asyncio
+    async def test_streams_records_with_line_numbers(self):
+        converter = make_converter()
+        records = []
+        lines = ['https://open.spotify.com/track/1\n', 'no link here\n', 'see https://open.spotify.com/track/2\n']
+
+        await converter.run(lines, records.append)
+
+        assert sorted(record['line'] for record in records) == [1, 3]
+        assert records[0]['links'] == {'YandexMusic': 'https://music.yandex.ru/track/1'}
+
+    @pytest.mark.asyncio
+    async def test_errors_do_not_stop_batch(self):
+        converter = make_converter(workers=1)
+        converter.parser.parse_link.side_effect = [RuntimeError('boom'), TRACK]
+        records = []
+
+        await converter.run(['https://a.example/1', 'https://a.example/2'], records.append)
+
+        assert records[0] == {'url': 'https://a.example/1', 'error': 'boom', 'line': 1}
+        assert records[1]['title'] == 'Song'
+
+    @pytest.mark.asyncio
+    async def test_skips_done_lines(self):
+        converter = make_converter()
+        records = []
+
+        await converter.run(['https://a.example/1', 'https://a.example/2'], records.append, skip=lambda line: line == 1)
+
+        assert [record['line'] for record in records] == [2]
+
+    @pytest.mark.asyncio
+    async def test_lines_without_links_advance_watermark(self, tmp_path):
+        converter = make_converter()
+        checkpoint = Checkpoint(str(tmp_path / 'out.ckpt'))
+        lines = []
+        for i in range(1, 100):
+            lines += [f'https://a.example/{i}\n', '\n' if i % 2 else 'no link here\n']
+
+        await converter.run(lines, lambda record: checkpoint.mark_done(record['line']), empty=checkpoint.mark_done)
+
+        assert checkpoint.watermark == len(lines)
+        assert checkpoint.done == set()
+
+class TestCheckpoint:
+    def test_watermark_advances_over_contiguous_lines(self, tmp_path):
+        checkpoint = Checkpoint(str(tmp_path / 'ckpt'))
+        for line in (1, 3, 2, 5):
+            checkpoint.mark_done(line)
+
+        assert checkpoint.watermark == 3
+        assert checkpoint.done == {5}
+        assert checkpoint.is_done(2) and checkpoint.is_done(5) and not checkpoint.is_done(4)
+
+    def test_recover_reads_tail_and_truncates_partial_line(self, tmp_path):
+        output_path = tmp_path / 'out.jsonl'
+        output_path.write_bytes(b'{"line": 1}\n{"line": 2}\n{"line": 3}\n{"li')
+        checkpoint = Checkpoint(str(tmp_path / 'ckpt'))
+        checkpoint.mark_done(1)
+        checkpoint.save(len(b'{"line": 1}\n'))
+
+        restored = Checkpoint(checkpoint.path)
+        assert restored.load()
+        with open(output_path, 'r+b') as output:
+            restored.recover(output)
+
+        assert restored.watermark == 3
+        assert output_path.read_bytes().endswith(b'{"line": 3}\n')
+
+class TestBatchCli:
+    def test_resume_skips_processed_lines(self, tmp_path):
+        input_path = tmp_path / 'links.txt'
+        input_path.write_text('https://a.example/1\nhttps://a.example/2\n')
+        output_path = tmp_path / 'out.jsonl'
+        converter = make_converter()
+
+        with patch.object(batch, 'BatchConverter', return_value=converter):
+            batch.main([str(input_path), '-o', str(output_path)])
+            input_path.write_text('https://a.example/1\nhttps://a.example/2\nhttps://a.example/3\n')
+            batch.main([str(input_path), '-o', str(output_path), '--resume'])
+
+        records = [json.loads(line) for line in output_path.read_text().splitlines()]
+        assert sorted(record['line'] for record in records) == [1, 2, 3]
+        assert converter.parser.parse_link.await_count == 3
+
+    def test_resume_without_output_starts_over(self, tmp_path):
+        input_path = tmp_path / 'links.txt'
+        input_path.write_text('https://a.example/1\nhttps://a.example/2\n')
+        output_path = tmp_path / 'out.jsonl'
+        converter = make_converter()
+
+        with patch.object(batch, 'BatchConverter', return_value=converter):
+            batch.main([str(input_path), '-o', str(output_path)])
+            output_path.unlink()
+            batch.main([str(input_path), '-o', str(output_path), '--resume'])
+
+        records = [json.loads(line) for line in output_path.read_text().splitlines()]
+        assert sorted(record['line'] for record in records) == [1, 2]
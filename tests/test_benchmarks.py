@@ -0,0 +1,85 @@
+import pytest
+from benchmarks import bench_pipeline
+from benchmarks.runner import BenchResult, compare
+from benchmarks.stubs import Latency, StubUpstream, fake_sdks, patch_http
+from src.link_parser import LinkParser
+
+class TestStubs:
+    @pytest.mark.asyncio
+    async def test_parsers_against_stub_upstream(self):
+        async with StubUpstream() as upstream:
+            with patch_http(upstream), fake_sdks():
+                parser = LinkParser()
+                spotify = await parser.parse_link('https://open.spotify.com/track/4u7EnebtmKWzUH433cf5Qv')
+                mts = await parser.parse_link('https://mts-music-spo.onelink.me/abc')
+                yandex = await parser.parse_link('https://music.yandex.ru/album/1/track/32047')
+        
+        assert (spotify['artists'], spotify['title']) == ('Queen', 'Bohemian Rhapsody - Remastered 2011')
+        assert (mts['artists'], mts['title']) == ('Queen', 'Bohemian Rhapsody')
+        assert (yandex['artists'], yandex['title']) == ('Queen', 'Bohemian Rhapsody')
+        # Spotify: 1 запрос, MTS: onelink, редирект на landing и страница трека
+        assert upstream.requests == 4
+    
+    def test_latency_jitter_bounds(self):
+        latency = Latency(0.01, 0.005, seed=1)
+        delays = [latency.delay() for _ in range(100)]
+        assert all(0.005 <= delay <= 0.015 for delay in delays)
+
+class TestRunner:
+    def test_compare_flags_regressions(self):
+        result = BenchResult('parse_link', [0.2] * 10, wall_time=2.0, peak_bytes=0)
+        baseline = {'parse_link': {'p95_ms': 100.0, 'throughput': 10.0}}
+        regressions = compare([result], baseline, tolerance=0.25)
+        assert len(regressions) == 2
+        assert compare([result], {'parse_link': {'p95_ms': 200.0, 'throughput': 5.0}}) == []
+    
+    def test_pipeline_smoke(self, capsys):
+        code = bench_pipeline.main(['--iterations', '4', '--concurrency', '2', '--latency-ms', '0',
+                                    '--jitter-ms', '0', '--telegram-ms', '0', '--no-compare'])
+        assert code == 0
+        output = capsys.readouterr().out
+        assert 'handle_message' in output
+    
+    def test_render_smoke(self, capsys):
+        from benchmarks import bench_render
+        code = bench_render.main(['--iterations', '50', '--tracks', '5', '--no-compare'])
+        assert code == 0
+        assert 'render_track_cached' in capsys.readouterr().out
+    
+    def test_router_smoke(self, capsys):
+        from benchmarks import bench_router
+        code = bench_router.main(['--iterations', '50', '--messages', '20', '--no-compare'])
+        assert code == 0
+        assert 'route_chat_legacy' in capsys.readouterr().out
+
+class TestLoadgen:
+    def test_generated_updates_are_valid(self):
+        from telegram import Update
+        from benchmarks.loadgen import UpdateGenerator
+        
+        generator = UpdateGenerator(inline_ratio=0.5, hot_ratio=1.0, hot_tracks=2, seed=3)
+        updates = [Update.de_json(generator.next(), None) for _ in range(50)]
+        
+        assert [update.update_id for update in updates] == list(range(1, 51))
+        assert any(update.inline_query for update in updates)
+        assert any(update.message for update in updates)
+        queries = {update.inline_query.query for update in updates if update.inline_query}
+        assert all(query.endswith(('1', '2')) for query in queries)
+    
+    def test_arrival_offsets_bursts(self):
+        from benchmarks.loadgen import arrival_offsets
+        
+        steady = list(arrival_offsets(50, 10, seed=1))
+        bursty = list(arrival_offsets(50, 10, burst_factor=5, burst_every=2, burst_length=1, seed=1))
+        
+        assert all(0 < offset < 10 for offset in steady)
+        assert len(bursty) > len(steady) * 2
+    
+    def test_polling_smoke(self, capsys):
+        from benchmarks import loadgen
+        
+        code = loadgen.main(['--rates', '10', '--step-seconds', '0.5', '--drain-seconds', '5',
+                             '--latency-ms', '0', '--jitter-ms', '0', '--telegram-ms', '0'])
+        
+        assert code == 0
+        assert 'target: polling' in capsys.readouterr().out
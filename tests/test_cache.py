@@ -0,0 +1,147 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.cache import TTLCache, canonical_url, track_key
+from src.ratelimit import UpstreamLimiter, parse_limits
+from src.link_parser import LinkParser
+from src.constants import SERVICES
+
+class TestTTLCache:
+    def test_lru_eviction(self):
+        cache = TTLCache('test', maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+
+    def test_expired_entry_is_missing(self):
+        cache = TTLCache('test')
+        cache.set('a', 1, ttl=-1)
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_loads_are_coalesced(self):
+        cache = TTLCache('test')
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 'value'
+
+        results = await asyncio.gather(*(cache.get_or_load('key', loader) for _ in range(5)))
+
+        assert results == ['value'] * 5
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_owner_cancellation_not_forwarded_to_waiters(self):
+        cache = TTLCache('test')
+
+        async def loader():
+            await asyncio.sleep(0.02)
+            return 'value'
+
+        owner = asyncio.create_task(cache.get_or_load('key', loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load('key', loader))
+        await asyncio.sleep(0)
+        owner.cancel()
+
+        assert await waiter == 'value'
+        assert owner.cancelled()
+        assert cache.get('key') == 'value'
+
+    @pytest.mark.asyncio
+    async def test_load_error_reaches_all_waiters(self):
+        cache = TTLCache('test')
+        loader = AsyncMock(side_effect=RuntimeError('boom'))
+
+        results = await asyncio.gather(*(cache.get_or_load('key', loader) for _ in range(3)), return_exceptions=True)
+
+        assert [str(result) for result in results] == ['boom'] * 3
+        assert loader.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_uncacheable_result_not_stored(self):
+        cache = TTLCache('test')
+        loader = AsyncMock(return_value={'error': 'boom'})
+
+        await cache.get_or_load('key', loader, cacheable=lambda value: 'error' not in value)
+        await cache.get_or_load('key', loader, cacheable=lambda value: 'error' not in value)
+
+        assert loader.await_count == 2
+
+class TestKeys:
+    def test_canonical_url_drops_tracking_params(self):
+        assert canonical_url('https://open.spotify.com/track/abc/?si=123#x') == 'https://open.spotify.com/track/abc'
+        assert canonical_url('https://music.yandex.ru/album/1/track/2?utm_source=x&feature=share') == 'https://music.yandex.ru/album/1/track/2'
+
+    def test_canonical_url_keeps_target_params(self):
+        base = 'https://mts-music-spo.onelink.me/sKFX?deep_link_value=https%3A%2F%2Fmusic.mts.ru%2Ftrack%2F'
+        assert canonical_url(base + '1&si=a') != canonical_url(base + '2&si=a')
+        assert canonical_url(base + '1&utm_campaign=x') == canonical_url(base + '1')
+
+    def test_track_key_ignores_case_and_spaces(self):
+        assert track_key({'artists': 'Queen ', 'title': 'Bohemian Rhapsody'}) == track_key({'artists': 'queen', 'title': ' BOHEMIAN RHAPSODY'})
+
+class TestRateLimit:
+    def test_parse_limits(self):
+        assert parse_limits('Spotify=4:10, MTS=2') == {'Spotify': (4, 10.0), 'MTS': (2, 0.0)}
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        limiter = UpstreamLimiter(2)
+        active = peak = 0
+
+        async def call():
+            nonlocal active, peak
+            async with limiter:
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_rate_is_bounded(self):
+        limiter = UpstreamLimiter(10, rate=100)
+        start = time.monotonic()
+        for _ in range(5):
+            async with limiter:
+                pass
+        assert time.monotonic() - start >= 0.035
+
+class TestParserCache:
+    @pytest.mark.asyncio
+    async def test_same_track_parsed_once(self):
+        parser = LinkParser()
+        spotify = AsyncMock(return_value={'title': 'Song', 'artists': 'Artist', 'original_service': SERVICES['Spotify']})
+
+        with patch.object(parser.parsers['Spotify'], 'parse', spotify):
+            await parser.parse_link('https://open.spotify.com/track/abc?si=1')
+            await parser.parse_link('https://open.spotify.com/track/abc?si=2')
+
+        assert spotify.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_track_has_no_share_params(self):
+        parser = LinkParser()
+
+        async def spotify(url):
+            return {'url': url, 'title': 'Song', 'artists': 'Artist', 'original_service': SERVICES['Spotify']}
+
+        with patch.object(parser.parsers['Spotify'], 'parse', spotify):
+            first = await parser.parse_link('https://open.spotify.com/track/abc?si=first')
+            second = await parser.parse_link('https://open.spotify.com/track/abc?si=second')
+
+        assert first['url'] == second['url'] == 'https://open.spotify.com/track/abc'
@@ -0,0 +1,101 @@
+import logging
+import sys
+import pytest
+from src import logger as log_module
+from src.logger import LazyRepr, log_event, log_async_method, log_method
+
+class Exploding:
+    """Объект, repr которого нельзя вызывать"""
+    def __repr__(self):
+        raise AssertionError('repr should not be rendered')
+
+class TestLazyRendering:
+    def test_lazy_repr_is_bounded(self):
+        text = str(LazyRepr({'payload': 'x' * 10000}))
+        assert len(text) < 200
+    
+    def test_args_not_rendered_above_debug(self, caplog):
+        @log_method
+        def method(self, value):
+            return value
+        
+        with caplog.at_level(logging.INFO):
+            assert method(None, Exploding()) is not None
+        assert any('выполнен за' in record.getMessage() for record in caplog.records)
+    
+    @pytest.mark.asyncio
+    async def test_async_args_rendered_at_debug(self, caplog):
+        @log_async_method
+        async def method(self, value):
+            return value
+        
+        with caplog.at_level(logging.DEBUG):
+            await method(None, 'track-url')
+        assert any('track-url' in record.getMessage() for record in caplog.records)
+    
+    @pytest.mark.asyncio
+    async def test_async_error_logged(self, caplog):
+        @log_async_method
+        async def method(self):
+            raise RuntimeError('boom')
+        
+        with caplog.at_level(logging.INFO), pytest.raises(RuntimeError):
+            await method(None)
+        assert any(record.levelno == logging.ERROR and 'boom' in record.getMessage() for record in caplog.records)
+
+class TestQueueHandler:
+    def make_record(self, msg, args):
+        return logging.LogRecord('tests', logging.INFO, __file__, 1, msg, args, None)
+    
+    def test_immutable_args_left_for_listener(self):
+        handler = log_module._QueueHandler(None)
+        record = handler.prepare(self.make_record('%s за %.2f сек', ('parse', 0.5)))
+        assert record.args == ('parse', 0.5)
+        assert record.getMessage() == 'parse за 0.50 сек'
+    
+    def test_mutable_args_snapshotted(self):
+        handler = log_module._QueueHandler(None)
+        fields = {'state': 'before'}
+        record = handler.prepare(self.make_record('%s', (LazyRepr(fields),)))
+        fields['state'] = 'after'
+        assert record.args is None
+        assert record.getMessage() == "{'state': 'before'}"
+
+    def test_caller_record_not_modified(self):
+        handler = log_module._QueueHandler(None)
+        fields = ['before']
+        record = self.make_record('%s', (fields,))
+        try:
+            raise RuntimeError('boom')
+        except RuntimeError:
+            record.exc_info = sys.exc_info()
+        
+        prepared = handler.prepare(record)
+        
+        assert prepared is not record
+        assert record.args == (fields,) and record.exc_info is not None
+        assert 'boom' in prepared.exc_text
+    
+    def test_non_str_msg_rendered(self):
+        handler = log_module._QueueHandler(None)
+        prepared = handler.prepare(self.make_record(['mutable'], ()))
+        assert prepared.msg == "['mutable']"
+
+class TestLogEvent:
+    def test_structured_fields(self, caplog):
+        test_logger = logging.getLogger('tests.events')
+        with caplog.at_level(logging.INFO):
+            log_event(test_logger, 'parse_done', service='Spotify', ms=12)
+        record = caplog.records[-1]
+        assert record.event == 'parse_done'
+        assert record.fields == {'service': 'Spotify', 'ms': 12}
+        assert record.getMessage() == "parse_done service='Spotify' ms=12"
+    
+    def test_sampling_and_level_gate(self, caplog, monkeypatch):
+        test_logger = logging.getLogger('tests.events')
+        monkeypatch.setattr(log_module.random, 'random', lambda: 0.9)
+        with caplog.at_level(logging.INFO):
+            log_event(test_logger, 'sampled_out', sample_rate=0.5)
+            log_event(test_logger, 'below_level', level=logging.DEBUG, value=Exploding())
+            log_event(test_logger, 'sampled_in', sample_rate=0.95)
+        assert [record.event for record in caplog.records] == ['sampled_in']
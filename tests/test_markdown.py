@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import patch
+from src.markdown import TrackRenderer, escape_markdown, escape_url
+from src.records import LinkResult, TrackInfo
+from src.constants import SERVICES
+
+DATA = TrackInfo('Spotify', 'https://open.spotify.com/track/1', 'Crazy In Love (feat. JAY-Z)', 'Beyoncé')
+LINKS = [LinkResult('YandexMusic', 'https://music.yandex.ru/album/1/track/2'), LinkResult('MTS')]
+
+class TestEscaping:
+    def test_escapes_all_markdown_v2_specials(self):
+        assert escape_markdown('a_b*c[d]e(f)g~h`i>j#k+l-m=n|o{p}q.r!s\\t') == \
+            'a\\_b\\*c\\[d\\]e\\(f\\)g\\~h\\`i\\>j\\#k\\+l\\-m\\=n\\|o\\{p\\}q\\.r\\!s\\\\t'
+
+    def test_digits_and_letters_untouched(self):
+        assert escape_markdown('AC/DC 1979') == 'AC/DC 1979'
+        assert escape_markdown('') == 'N/A'
+
+    def test_escape_url(self):
+        assert escape_url('https://x.ru/a_(b)') == 'https://x.ru/a_(b\\)'
+
+class TestTrackRenderer:
+    def test_track_layout(self):
+        text = TrackRenderer().track(DATA, LINKS)
+
+        assert text == (
+            '*Beyoncé* \\- Crazy In Love \\(feat\\. JAY\\-Z\\)\n'
+            f'[{escape_markdown(SERVICES["Spotify"]["name"])}](https://open.spotify.com/track/1)\n'
+            f'[{escape_markdown(SERVICES["YandexMusic"]["name"])}](https://music.yandex.ru/album/1/track/2)\n'
+        )
+
+    def test_dict_input_matches_records(self):
+        data = DATA.to_dict()
+        links = [link.to_dict() for link in LINKS]
+        assert TrackRenderer(maxsize=0).track(data, links) == TrackRenderer(maxsize=0).track(DATA, LINKS)
+
+    def test_dict_without_service_uses_url(self):
+        data = {'url': DATA.url, 'title': DATA.title, 'artists': DATA.artists}
+        assert TrackRenderer().track(data, LINKS) == TrackRenderer().track(DATA, LINKS)
+
+        with pytest.raises(ValueError):
+            TrackRenderer().track(dict(data, url='https://example.com/1'), LINKS)
+
+    def test_cache_hit_skips_rendering(self):
+        renderer = TrackRenderer()
+        first = renderer.track(DATA, LINKS)
+
+        with patch.object(renderer, '_render_track') as render:
+            assert renderer.track(DATA, list(LINKS)) == first
+            render.assert_not_called()
+
+    def test_changed_links_rendered_again(self):
+        renderer = TrackRenderer()
+        first = renderer.track(DATA, LINKS)
+        second = renderer.track(DATA, LINKS + [LinkResult('MTS', 'https://music.mts.ru/track/3')])
+
+        assert second.startswith(first)
+        assert 'music.mts.ru' in second
+
+    def test_text_has_no_markup(self):
+        text = TrackRenderer().text(DATA, LINKS)
+        assert text.startswith('Beyoncé - Crazy In Love (feat. JAY-Z)\n')
+        assert 'https://music.yandex.ru/album/1/track/2' in text
@@ -48,19 +48,23 @@ class TestBotHandlers:
             'url': 'https://open.spotify.com/track/123'
         }
         
-        with patch('src.message_handler.parse_link') as mock_parse:
-            mock_parse.return_value = mock_data  # Теперь не async, так как синхронная версия
+        with patch('src.message_handler.parse_link') as mock_parse, \
+                patch('src.message_handler.find_link', return_value=[]) as mock_find:
+            mock_parse.return_value = mock_data
             # Мокаем reply_text для parsing_msg
             parsing_msg = AsyncMock(spec=Message)
             parsing_msg.message_id = 456
-            mock_message.reply_text.side_effect = [parsing_msg, None]
+            mock_message.reply_text.return_value = parsing_msg
             
             await handlers.handle_message(mock_update, context)
             
-            # Проверяем вызовы
-            assert mock_message.reply_text.call_count == 2
-            parsing_msg.delete.assert_called_once()
+            # Сообщение о разборе заменяется ответом
+            mock_message.reply_text.assert_called_once()
             mock_parse.assert_called_once_with('https://open.spotify.com/track/123')
+            mock_find.assert_called_once_with(mock_data)
+            text = parsing_msg.edit_text.call_args.args[0]
+            assert '*Test Artist* \\- Test Song' in text
+            assert 'https://open.spotify.com/track/123' in text
     
     @pytest.mark.asyncio
     async def test_handle_message_no_url(self):
@@ -90,11 +94,10 @@ class TestBotHandlers:
         
         with patch('src.message_handler.parse_link', return_value={'error': 'Failed'}):
             parsing_msg = AsyncMock(spec=Message)
-            mock_message.reply_text.side_effect = [parsing_msg, None]
+            mock_message.reply_text.return_value = parsing_msg
             
             await handlers.handle_message(mock_update, context)
             
-            # Должен ответить ошибкой
-            calls = mock_message.reply_text.call_args_list
-            assert len(calls) == 2
-            assert calls[1][0][0] == handlers.error_message
\ No newline at end of file
+            # Сообщение о разборе заменяется ошибкой
+            mock_message.reply_text.assert_called_once()
+            parsing_msg.edit_text.assert_called_once_with(handlers.error_message)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.metrics import Registry, record_cache, CACHE_REQUESTS, PARSE_SECONDS, FALLBACKS
+from src.link_parser import LinkParser
+from src.constants import SERVICES
+
+class TestRegistry:
+    def test_counter_render(self):
+        registry = Registry()
+        counter = registry.counter('test_total', 'Test counter', ('service',))
+        counter.inc(service='Spotify')
+        counter.inc(2, service='Spotify')
+        
+        text = registry.render()
+        
+        assert '# TYPE test_total counter' in text
+        assert 'test_total{service="Spotify"} 3' in text
+        assert counter.value(service='Spotify') == 3
+    
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.histogram('test_seconds', 'Test histogram', ('stage',), buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage='parse')
+        histogram.observe(0.5, stage='parse')
+        histogram.observe(5, stage='parse')
+        
+        text = registry.render()
+        
+        assert 'test_seconds_bucket{stage="parse",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{stage="parse",le="1.0"} 2' in text
+        assert 'test_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+        assert 'test_seconds_count{stage="parse"} 3' in text
+        assert 'test_seconds_sum{stage="parse"} 5.55' in text
+    
+    def test_missing_label(self):
+        registry = Registry()
+        counter = registry.counter('test_total', 'Test counter', ('service',))
+        with pytest.raises(ValueError):
+            counter.inc()
+    
+    def test_same_name_returns_same_metric(self):
+        registry = Registry()
+        assert registry.counter('a_total', 'A') is registry.counter('a_total', 'A')
+        with pytest.raises(ValueError):
+            registry.histogram('a_total', 'A')
+    
+    def test_label_escaping(self):
+        registry = Registry()
+        registry.counter('esc_total', 'Escaping', ('name',)).inc(name='a"b')
+        assert 'esc_total{name="a\\"b"} 1' in registry.render()
+    
+    def test_record_cache(self):
+        before = CACHE_REQUESTS.value(cache='test', result='hit')
+        record_cache('test', True)
+        assert CACHE_REQUESTS.value(cache='test', result='hit') == before + 1
+
+class TestInstrumentation:
+    @pytest.mark.asyncio
+    async def test_parse_link_records_latency_and_fallback(self):
+        parser = LinkParser()
+        count = PARSE_SECONDS.count(service='Spotify')
+        fallbacks = FALLBACKS.value(stage='parse', service='Spotify')
+        
+        with patch.object(parser.parsers['Spotify'], 'parse', new_callable=AsyncMock) as mock_parse:
+            mock_parse.return_value = {
+                'url': 'https://open.spotify.com/track/123',
+                'original_service': SERVICES['Spotify'],
+                'title': 'Unknown Title',
+                'artists': 'Unknown Artist',
+            }
+            await parser.parse_link('https://open.spotify.com/track/123')
+        
+        assert PARSE_SECONDS.count(service='Spotify') == count + 1
+        assert FALLBACKS.value(stage='parse', service='Spotify') == fallbacks + 1
@@ -0,0 +1,173 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from telegram import Message
+from src.playlist import Collection, CollectionJob, CollectionResolver, Page, SpotifyCollection
+from src.message_handler import BotHandlers
+from src.constants import SERVICES
+
+def make_track(i):
+    return {
+        'url': f'https://open.spotify.com/track/{i}',
+        'original_service': SERVICES['Spotify'],
+        'title': f'Song {i}',
+        'artists': 'Artist',
+    }
+
+class FakeCollection(Collection):
+    def __init__(self, total, page_size=3, delay=0):
+        super().__init__(SERVICES['Spotify'])
+        self.total = total
+        self.page_size = page_size
+        self.delay = delay
+        self.pages_requested = 0
+
+    def match(self, url):
+        return True
+
+    async def pages(self, url):
+        for start in range(0, self.total, self.page_size):
+            self.pages_requested += 1
+            await asyncio.sleep(self.delay)
+            yield Page(self.total, [make_track(i) for i in range(start, min(start + self.page_size, self.total))])
+
+def make_finder():
+    finder = AsyncMock()
+    finder.find_link.return_value = [{'service': SERVICES['YandexMusic']['name'], 'url': 'https://music.yandex.ru/track/1'}]
+    return finder
+
+class TestCollectionResolver:
+    def test_match(self):
+        resolver = CollectionResolver()
+        assert isinstance(resolver.match('https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M?si=1'), SpotifyCollection)
+        assert resolver.match('https://open.spotify.com/track/123') is None
+        assert resolver.match('https://music.yandex.ru/album/123').service is SERVICES['YandexMusic']
+        assert resolver.match('https://music.yandex.ru/users/someone/playlists/3') is not None
+        assert resolver.match('https://music.yandex.ru/album/123/track/456') is None
+
+class TestCollectionJob:
+    @pytest.mark.asyncio
+    async def test_results_in_order(self):
+        job = CollectionJob(FakeCollection(7), 'url', finder=make_finder())
+
+        titles = [data['title'] async for data, _ in job.results()]
+
+        assert titles == [f'Song {i}' for i in range(7)]
+        assert job.total == 7 and job.resolved == 7 and job.truncated is None
+
+    @pytest.mark.asyncio
+    async def test_track_limit_stops_enumeration(self):
+        collection = FakeCollection(30)
+        job = CollectionJob(collection, 'url', finder=make_finder(), max_tracks=4)
+
+        results = [item async for item in job.results()]
+
+        assert len(results) == 4
+        assert collection.pages_requested == 2
+        assert job.truncated == 'limit'
+
+    @pytest.mark.asyncio
+    async def test_time_budget(self):
+        job = CollectionJob(FakeCollection(30, delay=0.05), 'url', finder=make_finder(), time_budget=0.12)
+
+        results = [item async for item in job.results()]
+
+        assert 0 < len(results) < 30
+        assert job.truncated == 'time'
+
+    @pytest.mark.asyncio
+    async def test_time_budget_slow_find(self):
+        finder = make_finder()
+
+        async def slow_find(track):
+            if track['title'] != 'Song 0':
+                await asyncio.sleep(1)
+            return []
+
+        finder.find_link.side_effect = slow_find
+        job = CollectionJob(FakeCollection(5), 'url', finder=finder, time_budget=0.1)
+
+        results = [item async for item in job.results()]
+
+        assert [data['title'] for data, _ in results] == ['Song 0']
+        assert job.truncated == 'time'
+
+    @pytest.mark.asyncio
+    async def test_find_error_does_not_stop_job(self):
+        finder = make_finder()
+        finder.find_link.side_effect = [RuntimeError('boom'), [], []]
+        job = CollectionJob(FakeCollection(3), 'url', finder=finder, concurrency=1)
+
+        links = [links async for _, links in job.results()]
+
+        assert links == [{'error': 'boom'}, [], []]
+
+class TestSpotifyCollection:
+    @pytest.mark.asyncio
+    async def test_playlist_pages(self):
+        sp = MagicMock()
+        item = {'track': {'name': 'Song', 'artists': [{'name': 'A'}, {'name': 'B'}], 'external_urls': {'spotify': 'https://open.spotify.com/track/1'}}}
+        sp.playlist_items.side_effect = [
+            {'total': 3, 'next': 'more', 'items': [item, {'track': None}]},
+            {'total': 3, 'next': None, 'items': [item]},
+        ]
+        collection = SpotifyCollection(SERVICES['Spotify'])
+
+        with patch('src.playlist._spotify_client', return_value=sp):
+            pages = [page async for page in collection.pages('https://open.spotify.com/playlist/abc')]
+
+        assert [len(page.tracks) for page in pages] == [1, 1]
+        assert pages[0].tracks[0]['artists'] == 'A, B'
+        assert sp.playlist_items.call_args_list[1].kwargs['offset'] == 2
+
+class TestPlaylistMessages:
+    async def run_handler(self, total):
+        handlers = BotHandlers()
+        handlers.collections.start = lambda url, **limits: CollectionJob(FakeCollection(total), url, finder=make_finder())
+        update = MagicMock()
+        update.message = AsyncMock(spec=Message)
+        update.message.text = 'https://open.spotify.com/playlist/abc'
+        status_msg = AsyncMock(spec=Message)
+        update.message.reply_text.return_value = status_msg
+        documents = []
+        
+        async def reply_document(document, filename):
+            documents.append(document.read().decode())
+        
+        update.message.reply_document.side_effect = reply_document
+        
+        await handlers.handle_message(update, MagicMock())
+        return update.message, status_msg, documents
+    
+    @pytest.mark.asyncio
+    async def test_short_playlist_sent_as_messages(self):
+        message, status_msg, documents = await self.run_handler(3)
+        
+        sent = [call.args[0] for call in message.reply_text.call_args_list[1:]]
+        assert len(sent) == 1
+        assert sent[0].count('Song') == 3
+        assert documents == []
+        status_msg.edit_text.assert_called_once_with('Resolved 3 of 3 tracks.')
+    
+    @pytest.mark.asyncio
+    async def test_long_playlist_sent_as_file(self):
+        with patch('src.message_handler.PLAYLIST_CHAT_TRACKS', 2):
+            message, status_msg, documents = await self.run_handler(5)
+        
+        assert message.reply_text.call_count == 1
+        assert documents[0].count('Song') == 5
+        status_msg.edit_text.assert_called_once_with('Resolved 5 of 5 tracks.')
+
+    @pytest.mark.asyncio
+    async def test_inline_playlist_not_parsed_as_track(self):
+        handlers = BotHandlers()
+        update = MagicMock()
+        update.inline_query = AsyncMock()
+        update.inline_query.query = 'https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M'
+
+        with patch('src.message_handler.parse_link') as mock_parse:
+            await handlers.inline_query(update, MagicMock())
+
+        mock_parse.assert_not_called()
+        [result] = update.inline_query.answer.call_args.args[0]
+        assert result.description == handlers.playlist_inline_message
@@ -0,0 +1,90 @@
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.cache import Popularity, TTLCache, canonical_url
+from src.link_parser import LinkParser
+from src.link_finder import LinkFinder
+from src.prewarm import CacheMaintainer, read_prewarm_file
+from src.constants import SERVICES
+
+URL = 'https://open.spotify.com/track/abc'
+TRACK = {'url': URL, 'title': 'Song', 'artists': 'Artist', 'original_service': SERVICES['Spotify']}
+
+def make_maintainer(**kwargs):
+    popularity = Popularity()
+    parser = LinkParser(cache=TTLCache('parse'), popularity=popularity)
+    finder = LinkFinder(cache=TTLCache('find'))
+    parse = AsyncMock(return_value=TRACK)
+    find = AsyncMock(return_value={'service': SERVICES['YandexMusic']['name'], 'url': 'https://example.com/1'})
+    patches = [
+        patch.object(parser.parsers['Spotify'], 'parse', parse),
+        patch.object(finder.finders['YandexMusic'], 'find', find),
+        patch.object(finder.finders['MTS'], 'find', find),
+    ]
+    maintainer = CacheMaintainer(parser=parser, finder=finder, popularity=popularity, **kwargs)
+    return maintainer, parse, find, patches
+
+class TestPopularity:
+    def test_top_and_decay(self):
+        popularity = Popularity()
+        for _ in range(3):
+            popularity.record('a', 'url-a')
+        popularity.record('b', 'url-b')
+
+        assert popularity.top(10, min_count=2) == [('a', 'url-a')]
+        popularity.decay(0.05)
+        assert popularity.count('b') == 0
+        assert popularity.count('a') == pytest.approx(0.15)
+
+    def test_keeps_most_popular_when_full(self):
+        popularity = Popularity(maxsize=2)
+        popularity.record('hot', 'url', weight=10)
+        for i in range(5):
+            popularity.record(i, 'url')
+
+        assert len(popularity) <= 4
+        assert popularity.count('hot') == 10
+
+class TestCacheMaintainer:
+    @pytest.mark.asyncio
+    async def test_prewarm_fills_caches(self):
+        maintainer, parse, find, patches = make_maintainer()
+        with patches[0], patches[1], patches[2]:
+            refreshed = await maintainer.prewarm([URL + '?si=1'])
+            data = await maintainer.parser.parse_link(URL)
+            links = await maintainer.finder.find_link(data)
+
+        assert refreshed == 3
+        assert parse.await_count == 1
+        assert find.await_count == 2
+        assert len(links) == 2
+
+    @pytest.mark.asyncio
+    async def test_refreshes_only_popular_expiring_entries(self):
+        maintainer, parse, find, patches = make_maintainer(refresh_ahead=60, min_hits=2)
+        with patches[0], patches[1], patches[2]:
+            for _ in range(2):
+                data = await maintainer.parser.parse_link(URL)
+                await maintainer.finder.find_link(data)
+            # Свежие записи не трогаем
+            assert await maintainer.refresh_once() == 0
+
+            key = canonical_url(URL)
+            maintainer.parser.cache.set(key, TRACK, ttl=30)
+            assert await maintainer.refresh_once() == 1
+
+        assert parse.await_count == 2
+        assert maintainer.parser.cache.expires_at(key) > time.monotonic() + 60
+
+    @pytest.mark.asyncio
+    async def test_unpopular_links_not_refreshed(self):
+        maintainer, parse, find, patches = make_maintainer(min_hits=2)
+        with patches[0], patches[1], patches[2]:
+            await maintainer.parser.parse_link(URL)
+            maintainer.parser.cache.clear()
+            assert await maintainer.refresh_once() == 0
+
+def test_read_prewarm_file(tmp_path):
+    path = tmp_path / 'top.txt'
+    path.write_text('# top tracks\nhttps://a.example/1\n\nhttps://a.example/2\n')
+    assert read_prewarm_file(str(path)) == ['https://a.example/1', 'https://a.example/2']
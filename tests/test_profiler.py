@@ -0,0 +1,146 @@
+import asyncio
+import pstats
+import threading
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from telegram import Update, Message, User
+from src import profiler
+from src.profiler import SamplingProfiler, UpdateProfiler
+from src.message_handler import BotHandlers
+
+class TestSamplingProfiler:
+    def test_collapsed_output(self, tmp_path):
+        stop = threading.Event()
+        worker = threading.Thread(target=stop.wait, name='worker')
+        worker.start()
+        try:
+            sampler = SamplingProfiler()
+            sampler.sample()
+            sampler.sample()
+        finally:
+            stop.set()
+            worker.join()
+        
+        path = tmp_path / 'out.collapsed'
+        sampler.write(str(path))
+        
+        lines = path.read_text().splitlines()
+        assert sampler.sample_count == 2
+        assert any('wait (threading.py' in line for line in lines)
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    
+    def test_timed_run_writes_file(self, tmp_path):
+        sampler = SamplingProfiler(interval=0.001)
+        path = sampler.start(0.02, str(tmp_path / 'run.collapsed'))
+        sampler.stop()
+        assert (tmp_path / 'run.collapsed').exists()
+        assert path.endswith('run.collapsed')
+
+class TestUpdateProfiler:
+    @pytest.mark.asyncio
+    async def test_profiles_next_updates(self, tmp_path):
+        update_profiler = UpdateProfiler()
+        
+        @update_profiler.wrap
+        async def handle():
+            await asyncio.sleep(0)
+            return sum(range(100))
+        
+        await handle()
+        assert update_profiler._profile is None
+        
+        path = update_profiler.request(2, str(tmp_path / 'updates.pstats'))
+        await asyncio.gather(handle(), handle())
+        
+        assert update_profiler.remaining == 0
+        stats = pstats.Stats(path)
+        assert any(name == 'handle' for _, _, name in stats.stats)
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_updates_reserve_slots(self, tmp_path):
+        update_profiler = UpdateProfiler()
+        
+        @update_profiler.wrap
+        async def handle():
+            await asyncio.sleep(0.01)
+        
+        path = update_profiler.request(1, str(tmp_path / 'updates.pstats'))
+        task = asyncio.create_task(handle())
+        await asyncio.sleep(0)
+        assert update_profiler.request(1, str(tmp_path / 'other.pstats')) is None
+        await asyncio.gather(task, handle(), handle())
+        
+        assert update_profiler.remaining == 0
+        assert update_profiler._profile is None
+        pstats.Stats(path)
+    
+    @pytest.mark.asyncio
+    async def test_pending_capture_not_replaced(self, tmp_path):
+        update_profiler = UpdateProfiler()
+        
+        @update_profiler.wrap
+        async def handle():
+            await asyncio.sleep(0)
+        
+        path = update_profiler.request(2, str(tmp_path / 'updates.pstats'))
+        await handle()
+        
+        assert update_profiler.request(5, str(tmp_path / 'other.pstats')) is None
+        await handle()
+        pstats.Stats(path)
+        assert update_profiler.request(1, str(tmp_path / 'other.pstats')) is not None
+    
+    def test_handle_request_validation(self):
+        with pytest.raises(ValueError):
+            profiler.handle_request('sample', '0')
+        with pytest.raises(ValueError):
+            profiler.handle_request('flame', '5')
+
+class TestProfileCommand:
+    def make_update(self, user_id):
+        update = AsyncMock(spec=Update)
+        update.effective_user = MagicMock(spec=User)
+        update.effective_user.id = user_id
+        update.message = AsyncMock(spec=Message)
+        return update
+    
+    @pytest.mark.asyncio
+    async def test_non_admin_ignored(self, monkeypatch):
+        monkeypatch.setenv('ADMIN_IDS', '1')
+        handlers = BotHandlers()
+        update = self.make_update(2)
+        context = MagicMock(args=['5'])
+        
+        await handlers.profile_command(update, context)
+        
+        update.message.reply_text.assert_not_called()
+    
+    def test_invalid_admin_ids_skipped(self, monkeypatch):
+        monkeypatch.setenv('ADMIN_IDS', '1, @admin, 3')
+        assert BotHandlers().admin_ids == {1, 3}
+    
+    @pytest.mark.asyncio
+    async def test_admin_starts_update_profiling(self, monkeypatch, tmp_path):
+        monkeypatch.setenv('ADMIN_IDS', '1, 3')
+        monkeypatch.setattr(profiler, 'PROFILE_DIR', str(tmp_path))
+        monkeypatch.setattr(profiler, 'UPDATE_PROFILER', UpdateProfiler())
+        handlers = BotHandlers()
+        update = self.make_update(3)
+        context = MagicMock(args=['updates', '4'])
+        
+        await handlers.profile_command(update, context)
+        
+        answer = update.message.reply_text.call_args[0][0]
+        assert answer.startswith('Profiling next 4 updates')
+        assert profiler.UPDATE_PROFILER.remaining == 4
+    
+    @pytest.mark.asyncio
+    async def test_admin_bad_arguments(self, monkeypatch):
+        monkeypatch.setenv('ADMIN_IDS', '1')
+        handlers = BotHandlers()
+        update = self.make_update(1)
+        context = MagicMock(args=['updates', 'many'])
+        
+        await handlers.profile_command(update, context)
+        
+        update.message.reply_text.assert_called_once_with(handlers.profile_usage)
@@ -0,0 +1,68 @@
+import sys
+import subprocess
+import pytest
+from src import providers
+from src.constants import SERVICES
+from src.import_budget import parse_importtime, check_budget, top_level_breakdown
+from src.link_parser import LinkParser, SpotifyParser
+
+class TestProviderMap:
+    def test_instances_created_on_demand(self):
+        parsers = providers.ProviderMap('parser')
+        assert 'Spotify' in parsers
+        assert parsers._instances == {}
+        
+        parser = parsers['Spotify']
+        
+        assert isinstance(parser, SpotifyParser)
+        assert parser.service is SERVICES['Spotify']
+        assert parsers['Spotify'] is parser
+    
+    def test_unknown_provider(self):
+        parsers = providers.ProviderMap('parser')
+        assert 'Deezer' not in parsers
+        with pytest.raises(KeyError):
+            parsers['Deezer']
+    
+    def test_link_parser_is_lazy(self):
+        parser = LinkParser()
+        assert parser.parsers._instances == {}
+    
+    def test_import_dependencies_skips_missing(self, monkeypatch):
+        monkeypatch.setitem(providers.PROVIDERS, 'Fake', {
+            'parser': ('src.link_parser', 'SpotifyParser'),
+            'finder': ('src.link_finder', 'SpotifyFinder'),
+            'deps': ('json', 'module_that_does_not_exist'),
+        })
+        timings = providers.import_dependencies(['Fake'])
+        assert 'json' in timings
+        assert 'module_that_does_not_exist' not in timings
+
+class TestImportBudget:
+    OUTPUT = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       100 |        100 |   json.decoder\n'
+        'import time:       200 |        300 | json\n'
+        'import time:      1500 |       1500 | bs4\n'
+    )
+    
+    def test_parse_importtime(self):
+        rows = parse_importtime(self.OUTPUT)
+        assert rows[0] == ('json.decoder', 100, 100, 1)
+        assert rows[1] == ('json', 200, 300, 0)
+        assert top_level_breakdown(rows)[0] == ('bs4', 1.5)
+    
+    def test_check_budget(self):
+        rows = parse_importtime(self.OUTPUT)
+        problems = check_budget(rows, budget_ms=1)
+        assert any('бюджет' in problem for problem in problems)
+        assert any('bs4' in problem for problem in problems)
+        assert check_budget(rows[:2], budget_ms=1) == []
+    
+    def test_cold_start_does_not_import_providers(self):
+        code = (
+            'import sys, src.message_handler, src.import_budget as b; '
+            'print(",".join(m for m in b.LAZY_MODULES if m in sys.modules))'
+        )
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        assert out.stdout.strip() == ''
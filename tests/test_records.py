@@ -0,0 +1,100 @@
+import io
+import sys
+import pytest
+from src.records import TrackInfo, LinkResult, dumps, loads, track_info, link_result
+from src.cache import TTLCache, ENTRY_OVERHEAD
+from src.constants import SERVICES
+from src import metrics
+
+TRACK = {
+    'url': 'https://open.spotify.com/track/1',
+    'original_service': SERVICES['Spotify'],
+    'title': 'Bohemian Rhapsody',
+    'artists': 'Queen',
+}
+
+class TestRecords:
+    def test_track_info_compatible_with_dict_access(self):
+        record = track_info(dict(TRACK))
+
+        assert isinstance(record, TrackInfo)
+        assert record.service == 'Spotify'
+        assert record['original_service']['name'] == SERVICES['Spotify']['name']
+        assert record['title'] == 'Bohemian Rhapsody'
+        assert 'error' not in record
+        assert record.to_dict() == TRACK
+
+    def test_errors_pass_through(self):
+        assert track_info({'error': 'Failed'}) == {'error': 'Failed'}
+        assert track_info(None) is None
+
+    def test_link_result_normalizes_shape(self):
+        found = link_result({'service': SERVICES['MTS']['name'], 'url': 'https://music.mts.ru/track/1'})
+        missing = link_result({'service': SERVICES['Spotify']['name']})
+
+        assert found['service'] == SERVICES['MTS']['name']
+        assert found.service == 'MTS'
+        assert missing.get('url') is None and missing['url'] is None
+        assert 'error' not in missing and not missing.get('fallback')
+
+    def test_service_ids_are_interned(self):
+        record = TrackInfo(SERVICES['Spotify'], 'u', 't', 'a')
+        assert record.service is sys.intern('Spotify')
+
+    @pytest.mark.parametrize('record', [
+        TrackInfo('YandexMusic', 'https://music.yandex.ru/album/1/track/2', 'Песня', 'Исполнитель'),
+        LinkResult('MTS', url=None, fallback=True, error='boom'),
+    ])
+    def test_serialization_roundtrip(self, record):
+        assert loads(dumps(record)) == record
+
+    def test_serialization_format_is_stable(self):
+        assert dumps(LinkResult('Spotify', 'https://x')) == '[1,"l","Spotify","https://x",false,null]'
+
+    def test_record_smaller_than_dict(self):
+        record = track_info(dict(TRACK))
+        assert record.nbytes() < sys.getsizeof(TRACK) + sum(sys.getsizeof(v) for v in TRACK.values())
+
+class TestCacheAccounting:
+    def test_bytes_tracked_on_set_and_evict(self):
+        cache = TTLCache('test')
+        record = track_info(dict(TRACK))
+        cache.set('a', record)
+        size = cache.nbytes
+        assert size >= record.nbytes() + ENTRY_OVERHEAD
+
+        cache.set('a', record)
+        assert cache.nbytes == size
+        cache.set('b', record, ttl=-1)
+        cache.get('b')
+        assert cache.nbytes == size
+        assert cache.stats()['bytes_per_entry'] == size
+
+    def test_memory_budget_evicts_oldest(self):
+        probe = TTLCache('test')
+        probe.set('a', track_info(dict(TRACK)))
+        cache = TTLCache('test', maxbytes=probe.nbytes * 3)
+        for key in 'abcde':
+            cache.set(key, track_info(dict(TRACK)))
+
+        assert len(cache) == 3
+        assert cache.nbytes <= cache.maxbytes
+        assert 'e' in cache and 'a' not in cache
+
+    def test_dump_and_load(self):
+        cache = TTLCache('test')
+        cache.set('https://open.spotify.com/track/1', track_info(dict(TRACK)))
+        cache.set(('YandexMusic', 'queen|bohemian rhapsody'), LinkResult('YandexMusic', 'https://music.yandex.ru/track/1'))
+        buffer = io.StringIO()
+        assert cache.dump(buffer) == 2
+
+        restored = TTLCache('test')
+        buffer.seek(0)
+        assert restored.load(buffer) == 2
+        assert restored.peek(('YandexMusic', 'queen|bohemian rhapsody')).url == 'https://music.yandex.ru/track/1'
+        assert restored.peek('https://open.spotify.com/track/1')['title'] == 'Bohemian Rhapsody'
+
+    def test_gauges_report_global_caches(self):
+        text = metrics.render_prometheus()
+        assert 'multilink_cache_bytes{cache="parse"}' in text
+        assert 'multilink_cache_entries{cache="find"}' in text
@@ -0,0 +1,51 @@
+import pytest
+from src.router import LinkRouter, ROUTER
+from src import providers
+from src.constants import SERVICES
+
+class TestLinkRouter:
+    @pytest.mark.parametrize('url, service', [
+        ('https://open.spotify.com/track/123', 'Spotify'),
+        ('HTTPS://OPEN.SPOTIFY.COM/track/123', 'Spotify'),
+        ('https://spotify.link/abc', 'Spotify'),
+        ('https://music.yandex.ru/album/1/track/2', 'YandexMusic'),
+        ('https://www.music.yandex.ru/album/1/track/2', 'YandexMusic'),
+        ('https://mts-music-spo.onelink.me/abc', 'MTS'),
+        ('https://www.youtube.com/watch?v=1', None),
+        ('https://open.spotify.com/', None),
+        ('https://open.spotify.com.evil.example/track/1', None),
+    ])
+    def test_route(self, url, service):
+        assert ROUTER.route(url) == service
+
+    def test_one_pass_extraction_skips_foreign_links(self):
+        text = 'сначала https://youtu.be/x, потом https://open.spotify.com/track/abc?si=1!'
+        assert list(ROUTER.extract(text)) == [
+            (None, 'https://youtu.be/x'),
+            ('Spotify', 'https://open.spotify.com/track/abc?si=1'),
+        ]
+        assert ROUTER.first_supported(text) == ('Spotify', 'https://open.spotify.com/track/abc?si=1')
+
+    def test_plain_text_has_no_links(self):
+        assert ROUTER.first_supported('просто текст без ссылок') is None
+
+    def test_unsupported_hosts_do_not_touch_service_regexes(self, monkeypatch):
+        class Exploding:
+            def match(self, url):
+                raise AssertionError('service regex used')
+        for name in SERVICES:
+            monkeypatch.setitem(SERVICES[name], 'regex', Exploding())
+        assert ROUTER.first_supported('https://example.com/a https://habr.com/b') is None
+        assert ROUTER.route('https://music.yandex.ru/album/1') == 'YandexMusic'
+
+    def test_register_provider_adds_hosts(self, monkeypatch):
+        router = LinkRouter.from_services(SERVICES)
+        monkeypatch.setattr(providers, 'ROUTER', router)
+        monkeypatch.setitem(providers.PROVIDERS, 'Deezer', {})
+        monkeypatch.setitem(SERVICES, 'Deezer', {})
+        providers.register_provider(
+            'Deezer', ('src.link_parser', 'SpotifyParser'), ('src.link_finder', 'SpotifyFinder'),
+            service_info={'name': 'Deezer', 'hosts': ('www.deezer.com', 'deezer.page.link')},
+        )
+        assert router.route('https://deezer.com/track/1') == 'Deezer'
+        assert router.route('https://deezer.page.link/abc') == 'Deezer'
@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from src.search_key import canonicalize
+from src.link_finder import LinkFinder
+from src.constants import SERVICES
+from src import metrics
+
+class TestCanonicalize:
+    @pytest.mark.parametrize('left, right', [
+        (('Queen', 'Bohemian Rhapsody - Remastered 2011'), ('queen', 'Bohemian Rhapsody (Remastered 2011)')),
+        (('Daft Punk feat. Pharrell Williams', 'Get Lucky'), ('Pharrell Williams, Daft Punk', 'Get Lucky')),
+        (('Daft Punk', 'Get Lucky (feat. Pharrell Williams)'), ('Daft Punk & Pharrell Williams', 'Get Lucky')),
+        (('Beyoncé', 'Halo'), ('Beyonce', 'HALO')),
+        (('Unknown Artist', 'Bohemian Rhapsody - слушать песню онлайн'), ('', 'Bohemian Rhapsody')),
+    ])
+    def test_variants_share_key(self, left, right):
+        assert canonicalize(*left).key == canonicalize(*right).key
+
+    def test_different_songs_differ(self):
+        assert canonicalize('Queen', 'Bohemian Rhapsody').key != canonicalize('Queen', 'Radio Ga Ga').key
+
+    def test_query_keeps_display_form(self):
+        key = canonicalize('Beyoncé feat. JAY-Z', 'Crazy In Love (Remastered 2011)')
+        assert key.query == 'Beyoncé feat. JAY-Z - Crazy In Love'
+        assert key.rules == ('featuring', 'version', 'diacritics', 'case')
+
+    def test_words_containing_feat_are_kept(self):
+        assert canonicalize('Sia', 'Left Behind').title == 'Left Behind'
+        assert canonicalize('Featherstone', 'Song').artists == ('Featherstone',)
+
+    def test_query_keeps_artist_separators(self):
+        key = canonicalize('Simon & Garfunkel', 'The Boxer')
+        assert key.query == 'Simon & Garfunkel - The Boxer'
+        assert key.key == 'garfunkel & simon|the boxer'
+
+    def test_placeholder_artist_dropped_from_query(self):
+        assert canonicalize('Unknown Artist', 'Song - слушать песню онлайн').query == 'Song'
+
+class TestFinderNormalization:
+    @pytest.mark.asyncio
+    async def test_variants_hit_cache_once(self):
+        finder = LinkFinder()
+        find = AsyncMock(return_value={'service': SERVICES['YandexMusic']['name'], 'url': 'https://example.com/1'})
+        tracks = [
+            {'artists': 'Queen', 'title': 'Bohemian Rhapsody - Remastered 2011', 'original_service': SERVICES['Spotify']},
+            {'artists': 'queen', 'title': 'Bohemian Rhapsody (Remastered 2011)', 'original_service': SERVICES['Spotify']},
+        ]
+        before = metrics.CACHE_NORMALIZED.value(cache='find', rule='version', result='hit')
+
+        with patch.object(finder.finders['YandexMusic'], 'find', find), patch.object(finder.finders['MTS'], 'find', find):
+            for track in tracks:
+                await finder.find_link(track)
+
+        assert find.await_count == 2
+        assert find.await_args_list[0].args[0] is tracks[0]
+        assert metrics.CACHE_NORMALIZED.value(cache='find', rule='version', result='hit') == before + 2
+
+    @pytest.mark.asyncio
+    async def test_placeholder_title_skips_search(self):
+        finder = LinkFinder()
+        find = AsyncMock()
+        track = {'artists': 'Unknown Artist', 'title': 'Unknown Title', 'original_service': SERVICES['Spotify']}
+
+        with patch.object(finder.finders['YandexMusic'], 'find', find), patch.object(finder.finders['MTS'], 'find', find):
+            links = await finder.find_link(track)
+
+        find.assert_not_awaited()
+        assert len(finder.cache) == 0
+        assert all(link['fallback'] for link in links)
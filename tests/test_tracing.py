@@ -0,0 +1,87 @@
+import asyncio
+import json
+import pytest
+from src.tracing import Tracer, RingBufferExporter, JsonlExporter, trace_update
+from src import tracing
+
+class TestTracer:
+    def test_nested_spans(self):
+        exporter = RingBufferExporter()
+        tracer = Tracer(sample_rate=1.0, exporters=[exporter])
+        
+        with tracer.trace('update', update_id=1):
+            with tracer.span('parse', service='Spotify') as span:
+                span.set(cache='miss')
+                with tracer.span('http', upstream='open.spotify.com'):
+                    pass
+        
+        [trace] = exporter.traces()
+        names = [span['name'] for span in trace['spans']]
+        assert names == ['update', 'parse', 'http']
+        assert trace['spans'][1]['parent'] == 0
+        assert trace['spans'][2]['parent'] == 1
+        assert trace['spans'][1]['attributes'] == {'service': 'Spotify', 'cache': 'miss'}
+    
+    def test_span_outside_trace_is_noop(self):
+        tracer = Tracer()
+        with tracer.span('parse') as span:
+            assert span is None
+    
+    def test_unsampled_fast_trace_not_exported(self):
+        exporter = RingBufferExporter()
+        tracer = Tracer(sample_rate=0.0, slow_seconds=10, exporters=[exporter])
+        with tracer.trace('update'):
+            pass
+        assert exporter.traces() == []
+    
+    def test_slow_and_failed_traces_always_exported(self):
+        exporter = RingBufferExporter()
+        tracer = Tracer(sample_rate=0.0, slow_seconds=0.0, exporters=[exporter])
+        with tracer.trace('update'):
+            pass
+        
+        tracer.slow_seconds = 10
+        with pytest.raises(ValueError):
+            with tracer.trace('update'):
+                with tracer.span('find'):
+                    raise ValueError('upstream down')
+        
+        traces = exporter.traces()
+        assert len(traces) == 2
+        assert traces[1]['spans'][1]['error'] == 'upstream down'
+    
+    def test_jsonl_exporter(self, tmp_path):
+        path = tmp_path / 'traces.jsonl'
+        tracer = Tracer(sample_rate=1.0, exporters=[JsonlExporter(str(path))])
+        with tracer.trace('update'):
+            pass
+        with tracer.trace('update'):
+            pass
+        tracer.exporters[0].flush()
+        lines = path.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])['spans'][0]['name'] == 'update'
+    
+    @pytest.mark.asyncio
+    async def test_context_propagates_to_tasks(self, monkeypatch):
+        exporter = RingBufferExporter()
+        monkeypatch.setattr(tracing, 'TRACER', Tracer(sample_rate=1.0, exporters=[exporter]))
+        
+        async def find(service):
+            with tracing.span('find', service=service):
+                await asyncio.sleep(0)
+        
+        class Handlers:
+            @trace_update('message')
+            async def handle(self, update):
+                await asyncio.gather(find('Spotify'), find('MTS'))
+        
+        class FakeUpdate:
+            update_id = 42
+        
+        await Handlers().handle(FakeUpdate())
+        
+        [trace] = exporter.traces()
+        assert trace['spans'][0]['attributes'] == {'handler': 'message', 'update_id': 42}
+        assert sorted(span['attributes']['service'] for span in trace['spans'][1:]) == ['MTS', 'Spotify']
+        assert all(span['parent'] == 0 for span in trace['spans'][1:])